@@ -15,7 +15,8 @@
 // You should have received a copy of the GNU General Public License
 // along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-%module(package="exiv2") exif
+%module(package="exiv2", threads="1") exif
+%nothread;
 
 #ifndef SWIGIMPORTED
 %constant char* __doc__ = "Exif metadatum, container and iterators.";
@@ -64,6 +65,13 @@ EXV_ENABLE_FILESYSTEM_FUNCTION(Exiv2::ExifThumbC::writeFile)
 // ExifThumb keeps a reference to the ExifData it uses
 KEEP_REFERENCE_EX(Exiv2::ExifThumb*, args)
 
+// ExifThumb's methods change the ExifData, so its key index is dropped
+%typemap(check, fragment="key_index") Exiv2::ExifThumb* self {
+    PyObject* args = private_store_get(self, "refers_to");
+    if (args && PyTuple_Check(args) && PyTuple_GET_SIZE(args) > 0)
+        drop_key_index<Exiv2::ExifData>(PyTuple_GET_ITEM(args, 0));
+}
+
 INPUT_BUFFER_RO(const Exiv2::byte* buf, BUFLEN_T size)
 
 DATA_CONTAINER(ExifData, Exifdatum, ExifKey,
@@ -79,6 +87,48 @@ WINDOWS_PATH(const std::string& path)
 %ignore Exiv2::ExifData::findKey(ExifKey const &) const;
 %ignore Exiv2::ExifParser;
 
+// Encode and decode ExifData with ExifParser
+%thread Exiv2::ExifData::from_bytes;
+%newobject Exiv2::ExifData::from_bytes;
+%feature("docstring") Exiv2::ExifData::to_bytes
+"Encode the Exif data as a TIFF format binary blob.
+
+This uses libexiv2's own encoder, so it is much faster than converting
+every datum to Python. The result can be decoded with :py:meth:`from_bytes`.
+As with writing Exif to a JPEG file, some large tags may be omitted if
+the result would not fit in a JPEG APP1 segment.
+
+:type byteOrder: :py:class:`ByteOrder`, optional
+:param byteOrder: Byte order of the result. Defaults to
+    ``ByteOrder.littleEndian``.
+:rtype: bytes"
+%feature("docstring") Exiv2::ExifData::from_bytes
+"Decode a TIFF format binary blob to a new ExifData.
+
+The blob's data is parsed in place, without copying it, and the GIL is
+released while it is decoded.
+
+:type buf: :term:`bytes-like object`
+:param buf: A TIFF format blob, e.g. the result of :py:meth:`to_bytes`.
+:rtype: :py:class:`ExifData`"
+%extend Exiv2::ExifData {
+    PyObject* to_bytes(Exiv2::ByteOrder byteOrder) {
+        Exiv2::Blob blob;
+        Exiv2::ExifParser::encode(blob, byteOrder, *self);
+        return PyBytes_FromStringAndSize((const char*)blob.data(), blob.size());
+    }
+    PyObject* to_bytes() {
+        Exiv2::Blob blob;
+        Exiv2::ExifParser::encode(blob, Exiv2::littleEndian, *self);
+        return PyBytes_FromStringAndSize((const char*)blob.data(), blob.size());
+    }
+    static Exiv2::ExifData* from_bytes(const Exiv2::byte* buf, BUFLEN_T size) {
+        std::unique_ptr<Exiv2::ExifData> result(new Exiv2::ExifData());
+        Exiv2::ExifParser::decode(*result, buf, size);
+        return result.release();
+    }
+}
+
 // Exifdatum::ifdId is documented as internal use only
 %ignore Exiv2::Exifdatum::ifdId;
 
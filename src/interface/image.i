@@ -27,8 +27,10 @@
 %include "shared/preamble.i"
 %include "shared/buffers.i"
 %include "shared/keep_reference.i"
+%include "shared/key_index.i"
 %include "shared/private_data.i"
 %include "shared/windows.i"
+%include "shared/xmp_lock.i"
 
 %include "std_string.i"
 
@@ -71,6 +73,7 @@ INPUT_BUFFER_RO(const Exiv2::byte* data, BUFLEN_T size,
 
 // Release memory buffer after writeMetadata, as it creates its own copy
 RELEASE_BUFFER(void writeMetadata)
+RELEASE_BUFFER(bool writeMetadata)
 
 // Add Image::data() method for easy data access to image data
 %feature("docstring") Exiv2::Image::data
@@ -105,11 +108,645 @@ DEFINE_VIEW_CALLBACK(Exiv2::Image, release_ptr(&self->io());)
 %{
 #define RELEASE_VIEWS_Image_readMetadata
 #define RELEASE_VIEWS_Image_writeMetadata
+#define XMP_UNTOUCHED_Image_readMetadata
+#define XMP_REUSE_PACKET_Image_writeMetadata
+#define XMP_TOUCHED_Image_xmpData
+#define XMP_TOUCHED_Image_setXmpData
+#define XMP_TOUCHED_Image_clearXmpData
+#define XMP_TOUCHED_Image_setXmpPacket
+#define XMP_TOUCHED_Image_clearXmpPacket
+#define XMP_TOUCHED_Image_setMetadata
+#define XMP_TOUCHED_Image_clearMetadata
+#define XMP_TOUCHED_Image_writeXmpFromPacket
+#define DROP_KEY_INDEX_Image_readMetadata
+#define DROP_KEY_INDEX_Image_writeMetadata
+#define DROP_KEY_INDEX_Image_setMetadata
+#define DROP_KEY_INDEX_Image_clearMetadata
+#define DROP_KEY_INDEX_Image_setExifData
+#define DROP_KEY_INDEX_Image_clearExifData
+#define DROP_KEY_INDEX_Image_setIptcData
+#define DROP_KEY_INDEX_Image_clearIptcData
+#define DROP_KEY_INDEX_Image_setXmpData
+#define DROP_KEY_INDEX_Image_clearXmpData
+#define DROP_KEY_INDEX_Image_setXmpPacket
+#define RELEASE_VIEWS_Image_structure
+#define RELEASE_VIEWS_Image_content_digest
 %}
-%typemap(check, fragment="memoryview_funcs") Exiv2::Image* self {
+// Lazy XMP mode needs to know if the XMP data may have been changed since
+// readMetadata(). Any XmpData object still alive could be used to change it.
+// The state is only stored when lazy mode is enabled, so other images just
+// pay for one failed lookup in the XMP methods. Dead weak references are
+// purged when the number stored has doubled, as in pointer_store.i.
+%fragment("lazy_xmp", "header", fragment="private_data") {
+%#include <algorithm>
+%#include <vector>
+
+struct lazy_xmp_t {
+    bool touched;
+    bool forced;
+    std::vector<PyObject*> refs;
+    size_t purge_at;
+    lazy_xmp_t(): touched(true), forced(false), purge_at(16) {}
+    ~lazy_xmp_t() {
+        for (PyObject* ref : refs)
+            Py_DECREF(ref);
+    }
+    void purge() {
+        size_t out = 0;
+        for (size_t in = 0; in < refs.size(); in++) {
+            if (PyWeakref_GetObject(refs[in]) == Py_None)
+                Py_DECREF(refs[in]);
+            else
+                refs[out++] = refs[in];
+        }
+        refs.resize(out);
+        purge_at = std::max(refs.size() * 2, (size_t)16);
+    }
+};
+static void _delete_lazy_xmp(PyObject* capsule) {
+    delete (lazy_xmp_t*)PyCapsule_GetPointer(capsule, "lazy_xmp");
+};
+static lazy_xmp_t* get_lazy_xmp(PyObject* py_self) {
+    PyObject* capsule = private_store_get(py_self, "lazy_xmp");
+    if (!capsule)
+        return NULL;
+    return (lazy_xmp_t*)PyCapsule_GetPointer(capsule, "lazy_xmp");
+};
+static int set_lazy_xmp(PyObject* py_self, bool enable) {
+    if (!enable)
+        return private_store_del(py_self, "lazy_xmp");
+    if (get_lazy_xmp(py_self))
+        return 0;
+    lazy_xmp_t* lazy = new lazy_xmp_t();
+    PyObject* capsule = PyCapsule_New(lazy, "lazy_xmp", _delete_lazy_xmp);
+    if (!capsule) {
+        delete lazy;
+        return -1;
+    }
+    int error = private_store_set(py_self, "lazy_xmp", capsule);
+    Py_DECREF(capsule);
+    return error;
+};
+static int store_xmp_ref(lazy_xmp_t* lazy, PyObject* xmp_data) {
+    if (lazy->refs.size() >= lazy->purge_at)
+        lazy->purge();
+    PyObject* xmp_ref = PyWeakref_NewRef(xmp_data, NULL);
+    if (!xmp_ref)
+        return -1;
+    lazy->refs.push_back(xmp_ref);
+    return 0;
+};
+static bool xmp_touched(lazy_xmp_t* lazy) {
+    if (lazy->touched)
+        return true;
+    lazy->purge();
+    return !lazy->refs.empty();
+};
+}
+%typemap(check, fragment="memoryview_funcs", fragment="key_index",
+         fragment="lazy_xmp") Exiv2::Image* self {
 %#ifdef RELEASE_VIEWS_$symname
     release_views(self);
 %#endif
+%#ifdef DROP_KEY_INDEX_$symname
+    if (drop_image_key_indexes(self))
+        SWIG_fail;
+%#endif
+%#ifdef XMP_UNTOUCHED_$symname
+    if (lazy_xmp_t* lazy = get_lazy_xmp(self))
+        lazy->touched = false;
+%#endif
+%#ifdef XMP_TOUCHED_$symname
+    if (lazy_xmp_t* lazy = get_lazy_xmp(self))
+        lazy->touched = true;
+%#endif
+%#ifdef XMP_REUSE_PACKET_$symname
+    if (lazy_xmp_t* lazy = get_lazy_xmp(self)) {
+        if (!xmp_touched(lazy) && !$1->writeXmpFromPacket()) {
+            $1->writeXmpFromPacket(true);
+            lazy->forced = true;
+        }
+    }
+%#endif
+}
+// Undo writeXmpFromPacket(true) set by a lazy writeMetadata()
+%typemap(freearg, fragment="lazy_xmp") Exiv2::Image* self {
+%#ifdef XMP_REUSE_PACKET_$symname
+    if (lazy_xmp_t* lazy = get_lazy_xmp(self)) {
+        if (lazy->forced) {
+            lazy->forced = false;
+            $1->writeXmpFromPacket(false);
+        }
+    }
+%#endif
+}
+
+// Add lazy XMP mode, which writes the XMP packet verbatim if the XMP data
+// hasn't been used since readMetadata()
+%feature("docstring") Exiv2::Image::setLazyXmp
+"Enable or disable lazy XMP mode.
+
+In lazy XMP mode, writeMetadata() writes the XMP packet read by
+readMetadata() unchanged, without encoding the XMP data, if none of
+xmpData(), setXmpData(), clearXmpData(), setXmpPacket(),
+clearXmpPacket(), setMetadata(), clearMetadata() or writeXmpFromPacket()
+has been called since the metadata was read, and no XmpData object
+returned by an earlier xmpData() call still exists. This saves the cost
+of encoding the XMP data when only Exif or IPTC metadata is changed.
+
+Lazy XMP mode takes effect from the next readMetadata() call. Enable it
+before reading the metadata or calling xmpData(), as XmpData objects
+got before it was enabled are not tracked.
+
+libexiv2 still parses the XMP packet in readMetadata(), so this mode
+does not reduce the cost of reading.
+
+:type enable: bool, optional
+:param enable: True (the default) to enable lazy XMP mode."
+%extend Exiv2::Image {
+    %fragment("lazy_xmp");
+    PyObject* setLazyXmp(PyObject* py_self, bool enable) {
+        if (set_lazy_xmp(py_self, enable))
+            return NULL;
+        return SWIG_Py_Void();
+    }
+}
+
+// Add Image::writeMetadata overload to overwrite just the changed data
+%feature("docstring") Exiv2::Image::writeMetadata "
+*Overload 1:*
+
+Write metadata back to the image.
+
+All existing metadata sections in the image are either created,
+replaced, or erased. If values for a given metadata type have been
+assigned, a section for that metadata type will either be created or
+replaced. If no values have been assigned to a given metadata type,
+any exists section for that metadata type will be removed from the
+image.
+
+:raises: Error if the operation fails
+
+|
+
+*Overload 2:*
+
+Write metadata back to the image, in place if possible.
+
+If ``inPlace`` is True and the image is a file, the new file is
+written to memory first. If it's the same size as the existing file,
+e.g. after changing a fixed size value such as
+``Exif.Image.Orientation``, only the blocks of the file that have
+changed are overwritten. Otherwise the file is rewritten in the normal
+way.
+
+Writing in place is not atomic, so it is only done if you ask for it.
+The normal write replaces the file with a complete new one, but if
+writing in place is interrupted, e.g. by a power failure, the file may
+be left with only some of its blocks changed. The changed blocks are
+flushed to disc (with fsync) before this method returns. Don't use it
+on files you can't afford to lose.
+
+In lazy XMP mode (see :py:meth:`setLazyXmp`) the XMP packet is reused
+in the same way as a normal write.
+
+:type inPlace: bool
+:param inPlace: Set to True to try writing in place.
+:rtype: bool
+:return: True if the file was written in place.
+:raises: Error if the operation fails"
+%fragment("write_in_place", "header",
+          fragment="set_EXV_ENABLE_FILESYSTEM") {
+%#include <algorithm>
+%#include <climits>
+%#include <cstdio>
+%#include <cstring>
+%#include <utility>
+%#include <vector>
+%#ifdef _WIN32
+%#include <io.h>
+%#else
+%#include <unistd.h>
+%#endif
+
+%#ifdef EXV_ENABLE_FILESYSTEM
+typedef std::vector<std::pair<size_t, size_t>> block_list_t;
+
+// Overwrite blocks of a file with the same blocks of new data, then flush
+// the file to disc before returning
+static void _overwrite_blocks(const std::string& path,
+                              const Exiv2::byte* data,
+                              const block_list_t& blocks) {
+    FILE* file = std::fopen(path.c_str(), "r+b");
+    if (!file)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerFileOpenFailed,
+                           path, "r+b", Exiv2::strError());
+    bool ok = true;
+    for (auto& block : blocks) {
+        ok = block.first <= (size_t)LONG_MAX &&
+             std::fseek(file, (long)block.first, SEEK_SET) == 0 &&
+             std::fwrite(data + block.first, 1, block.second,
+                         file) == block.second;
+        if (!ok)
+            break;
+    }
+    ok = ok && std::fflush(file) == 0;
+%#ifdef _WIN32
+    ok = ok && _commit(_fileno(file)) == 0;
+%#else
+    ok = ok && fsync(fileno(file)) == 0;
+%#endif
+    ok = std::fclose(file) == 0 && ok;
+    if (!ok)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerImageWriteFailed);
+};
+
+// Write the image's metadata to a copy of the file in memory, then
+// overwrite the changed blocks of the file if its size is unchanged
+static bool _write_file_in_place(Exiv2::Image* image) {
+    const size_t block_size = 4096;
+    Exiv2::BasicIo& io = image->io();
+    std::string path = io.path();
+    if (io.open() != 0)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerDataSourceOpenFailed,
+                           path, Exiv2::strError());
+    bool result = false;
+    try {
+        // The copy shares the mapped file data until it's written
+        const Exiv2::byte* old_data = io.mmap(false);
+        size_t size = io.size();
+        auto copy = Exiv2::ImageFactory::open(old_data, size);
+        copy->setByteOrder(image->byteOrder());
+        copy->setMetadata(*image);
+        copy->writeXmpFromPacket(image->writeXmpFromPacket());
+        copy->writeMetadata();
+        Exiv2::BasicIo& copy_io = copy->io();
+        if (copy_io.size() == size) {
+            const Exiv2::byte* data = copy_io.mmap(false);
+            block_list_t blocks;
+            for (size_t start = 0; start < size; start += block_size) {
+                size_t len = std::min(block_size, size - start);
+                if (std::memcmp(old_data + start, data + start, len) == 0)
+                    continue;
+                if (!blocks.empty() &&
+                        blocks.back().first + blocks.back().second == start)
+                    blocks.back().second += len;
+                else
+                    blocks.emplace_back(start, len);
+            }
+            // Release the file before writing to it
+            io.munmap();
+            io.close();
+            _overwrite_blocks(path, data, blocks);
+            result = true;
+        }
+    }
+    catch(...) {
+        io.munmap();
+        io.close();
+        throw;
+    }
+    io.munmap();
+    io.close();
+    return result;
+};
+%#endif
+
+static bool write_in_place(Exiv2::Image* image) {
+%#ifdef EXV_ENABLE_FILESYSTEM
+    if (dynamic_cast<Exiv2::FileIo*>(&image->io()) &&
+            _write_file_in_place(image))
+        return true;
+%#endif
+    image->writeMetadata();
+    return false;
+};
+}
+%extend Exiv2::Image {
+    %fragment("write_in_place");
+    bool writeMetadata(bool inPlace) {
+        if (inPlace)
+            return write_in_place(self);
+        self->writeMetadata();
+        return false;
+    }
+}
+
+// Add Image::structure() method to get the segments of a JPEG image
+%feature("docstring") Exiv2::Image::structure
+"Get a JPEG image file's segments.
+
+The file's markers are read directly, with the GIL released, and the
+result is a list of dicts, one for each segment of the file. The dict
+keys are ``address`` (int), ``marker`` (int, e.g. 0xffe1), ``name``
+(str, e.g. ``'APP1'``) and ``length`` (int, the value of the segment's
+length field, or ``None`` for markers without one). The entropy coded
+data after each ``SOS`` segment is skipped.
+
+Only JPEG images are supported.
+
+:rtype: list of dict
+:raises: Error if the image is not a JPEG image or its data is not
+    valid."
+%fragment("jpeg_segments", "header") {
+%#include <string>
+%#include <vector>
+
+struct jpeg_segment_t {
+    size_t address;
+    int marker;
+    size_t length;  // 0 if the marker has no length field
+};
+static bool _jpeg_standalone(int marker) {
+    // SOI, EOI, TEM and RSTn have no length field
+    return marker == 0xd8 || marker == 0xd9 || marker == 0x01 ||
+        (marker >= 0xd0 && marker <= 0xd7);
+};
+// Find the segments of JPEG data, skipping entropy coded data
+static std::vector<jpeg_segment_t> jpeg_segments(const Exiv2::byte* data,
+                                                 size_t size) {
+    if (size < 2 || data[0] != 0xff || data[1] != 0xd8)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerNotAJpeg);
+    std::vector<jpeg_segment_t> result;
+    bool in_scan = false;
+    size_t pos = 0;
+    while (pos + 1 < size) {
+        if (data[pos] != 0xff) {
+            if (!in_scan)
+                throw Exiv2::Error(Exiv2::ErrorCode::kerFailedToReadImageData);
+            pos++;
+            continue;
+        }
+        int marker = data[pos + 1];
+        if (marker == 0xff) {
+            // Fill byte
+            pos++;
+            continue;
+        }
+        if (in_scan && (marker == 0 || (marker >= 0xd0 && marker <= 0xd7))) {
+            // Stuffed zero byte or restart marker in entropy coded data
+            pos += 2;
+            continue;
+        }
+        jpeg_segment_t segment = {pos, 0xff00 | marker, 0};
+        pos += 2;
+        if (!_jpeg_standalone(marker)) {
+            if (pos + 2 > size)
+                throw Exiv2::Error(Exiv2::ErrorCode::kerFailedToReadImageData);
+            segment.length = (data[pos] << 8) | data[pos + 1];
+            if (segment.length < 2 || segment.length > size - pos)
+                throw Exiv2::Error(Exiv2::ErrorCode::kerFailedToReadImageData);
+            pos += segment.length;
+        }
+        result.push_back(segment);
+        if (marker == 0xd9)
+            break;
+        in_scan = marker == 0xda;
+    }
+    return result;
+};
+static std::string jpeg_marker_name(int marker) {
+    marker &= 0xff;
+    switch (marker) {
+        case 0x01: return "TEM";
+        case 0xc4: return "DHT";
+        case 0xc8: return "JPG";
+        case 0xcc: return "DAC";
+        case 0xd8: return "SOI";
+        case 0xd9: return "EOI";
+        case 0xda: return "SOS";
+        case 0xdb: return "DQT";
+        case 0xdc: return "DNL";
+        case 0xdd: return "DRI";
+        case 0xde: return "DHP";
+        case 0xdf: return "EXP";
+        case 0xfe: return "COM";
+    }
+    if (marker >= 0xc0 && marker <= 0xcf)
+        return "SOF" + std::to_string(marker - 0xc0);
+    if (marker >= 0xd0 && marker <= 0xd7)
+        return "RST" + std::to_string(marker - 0xd0);
+    if (marker >= 0xe0 && marker <= 0xef)
+        return "APP" + std::to_string(marker - 0xe0);
+    if (marker >= 0xf0 && marker <= 0xfd)
+        return "JPG" + std::to_string(marker - 0xf0);
+    return "RES";
+};
+// Get the image's data and run a function on it with the GIL released
+template<typename T>
+static T with_image_data(Exiv2::Image* image,
+                         T (*func)(const Exiv2::byte*, size_t)) {
+    Exiv2::BasicIo& io = image->io();
+    T result;
+    SWIG_PYTHON_THREAD_BEGIN_ALLOW;
+    if (io.open() != 0)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerDataSourceOpenFailed,
+                           io.path(), Exiv2::strError());
+    try {
+        result = func(io.mmap(false), io.size());
+    }
+    catch(...) {
+        io.munmap();
+        io.close();
+        throw;
+    }
+    io.munmap();
+    io.close();
+    SWIG_PYTHON_THREAD_END_ALLOW;
+    return result;
+};
+}
+%fragment("image_structure", "header", fragment="jpeg_segments") {
+static PyObject* _segment_dict(const jpeg_segment_t& segment) {
+    std::string name = jpeg_marker_name(segment.marker);
+    PyObject* length = segment.length ? PyLong_FromSize_t(segment.length)
+                                      : SWIG_Py_Void();
+    if (!length)
+        return NULL;
+    return Py_BuildValue(
+        "{s:n,s:i,s:s,s:N}", "address", (Py_ssize_t)segment.address,
+        "marker", segment.marker, "name", name.c_str(), "length", length);
+};
+static PyObject* image_structure(Exiv2::Image* image) {
+    if (image->imageType() != Exiv2::ImageType::jpeg)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerNotAJpeg);
+    std::vector<jpeg_segment_t> segments = with_image_data(
+        image, jpeg_segments);
+    PyObject* result = PyList_New(segments.size());
+    if (!result)
+        return NULL;
+    for (size_t i = 0; i < segments.size(); i++) {
+        PyObject* item = _segment_dict(segments[i]);
+        if (!item) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyList_SET_ITEM(result, i, item);
+    }
+    return result;
+};
+}
+%extend Exiv2::Image {
+    %fragment("image_structure");
+    PyObject* structure() {
+        return image_structure(self);
+    }
+}
+
+// Add Image::content_digest() method to hash the image without metadata
+%feature("docstring") Exiv2::Image::content_digest
+"Get a hash of the image file without its metadata.
+
+Only the parts of the file that hold image data are hashed, so the
+result doesn't change when the image's metadata is changed. The file
+is read directly, without libexiv2 parsing or writing it. Supported
+formats are:
+
+JPEG
+    All segments except ``APPn`` and ``COM``, which hold Exif, XMP,
+    IPTC, ICC profile and other application data.
+PNG
+    All chunks except ``tEXt``, ``zTXt``, ``iTXt``, ``eXIf`` and
+    ``iCCP``, which hold text, Exif, XMP and ICC profile data.
+
+Other image formats raise an exception. The file's structure is read
+with the GIL released, and the image data is hashed with
+:py:mod:`hashlib`.
+
+:type algorithm: str, optional
+:param algorithm: The name of a :py:mod:`hashlib` algorithm. Defaults
+    to ``'blake2b'``.
+:rtype: bytes
+:raises: Error if the image format is not supported or its data is not
+    valid."
+%typemap(default) const char* algorithm {$1 = (char*)"blake2b";}
+%fragment("content_digest", "header", fragment="jpeg_segments",
+          fragment="import_from_python") {
+%#include <cstring>
+%#include <utility>
+%#include <vector>
+
+typedef std::vector<std::pair<size_t, size_t>> range_list_t;
+
+static void _add_range(range_list_t& ranges, size_t start, size_t end) {
+    if (end > start)
+        ranges.emplace_back(start, end - start);
+};
+// Get the parts of JPEG data that aren't APPn or COM segments
+static range_list_t _jpeg_image_ranges(const Exiv2::byte* data,
+                                       size_t size) {
+    range_list_t result;
+    size_t start = 0;
+    for (auto& segment : jpeg_segments(data, size)) {
+        int marker = segment.marker & 0xff;
+        if ((marker >= 0xe0 && marker <= 0xef) || marker == 0xfe) {
+            _add_range(result, start, segment.address);
+            start = segment.address + 2 + segment.length;
+        }
+    }
+    _add_range(result, start, size);
+    return result;
+};
+// Get the parts of PNG data that aren't metadata chunks
+static range_list_t _png_image_ranges(const Exiv2::byte* data,
+                                      size_t size) {
+    static const char* metadata_chunks[] = {
+        "tEXt", "zTXt", "iTXt", "eXIf", "iCCP"};
+    if (size < 8 || std::memcmp(data, "\x89PNG\r\n\x1a\n", 8) != 0)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerNotAnImage, "PNG");
+    range_list_t result;
+    size_t start = 0;
+    size_t pos = 8;
+    while (pos + 12 <= size) {
+        size_t length = ((size_t)data[pos] << 24) | (data[pos + 1] << 16) |
+                        (data[pos + 2] << 8) | data[pos + 3];
+        if (length > size - pos - 12)
+            throw Exiv2::Error(Exiv2::ErrorCode::kerFailedToReadImageData);
+        const Exiv2::byte* type = data + pos + 4;
+        size_t end = pos + 12 + length;
+        for (auto chunk : metadata_chunks) {
+            if (std::memcmp(type, chunk, 4) == 0) {
+                _add_range(result, start, pos);
+                start = end;
+                break;
+            }
+        }
+        pos = end;
+        if (std::memcmp(type, "IEND", 4) == 0)
+            break;
+    }
+    _add_range(result, start, size);
+    return result;
+};
+// Hash parts of a buffer with hashlib, which releases the GIL for large
+// buffers
+static PyObject* hash_ranges(const char* algorithm, const Exiv2::byte* data,
+                             const range_list_t& ranges) {
+    PyObject* hash_new = import_from_python("hashlib", "new");
+    if (!hash_new)
+        return NULL;
+    PyObject* hash = PyObject_CallFunction(hash_new, "s", algorithm);
+    Py_DECREF(hash_new);
+    if (!hash)
+        return NULL;
+    for (auto& range : ranges) {
+        PyObject* view = PyMemoryView_FromMemory(
+            (char*)data + range.first, range.second, PyBUF_READ);
+        if (!view) {
+            Py_DECREF(hash);
+            return NULL;
+        }
+        PyObject* result = PyObject_CallMethod(hash, "update", "(O)", view);
+        Py_XDECREF(PyObject_CallMethod(view, "release", NULL));
+        Py_DECREF(view);
+        if (!result) {
+            Py_DECREF(hash);
+            return NULL;
+        }
+        Py_DECREF(result);
+    }
+    PyObject* result = PyObject_CallMethod(hash, "digest", NULL);
+    Py_DECREF(hash);
+    return result;
+};
+static PyObject* image_content_digest(Exiv2::Image* image,
+                                      const char* algorithm) {
+    range_list_t (*get_ranges)(const Exiv2::byte*, size_t) = NULL;
+    if (image->imageType() == Exiv2::ImageType::jpeg)
+        get_ranges = _jpeg_image_ranges;
+    else if (image->imageType() == Exiv2::ImageType::png)
+        get_ranges = _png_image_ranges;
+    else
+        throw Exiv2::Error(Exiv2::ErrorCode::kerErrorMessage,
+            "Image.content_digest() only supports JPEG and PNG images");
+    Exiv2::BasicIo& io = image->io();
+    const Exiv2::byte* data = NULL;
+    range_list_t ranges;
+    SWIG_PYTHON_THREAD_BEGIN_ALLOW;
+    if (io.open() != 0)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerDataSourceOpenFailed,
+                           io.path(), Exiv2::strError());
+    try {
+        data = io.mmap(false);
+        ranges = get_ranges(data, io.size());
+    }
+    catch(...) {
+        io.munmap();
+        io.close();
+        throw;
+    }
+    SWIG_PYTHON_THREAD_END_ALLOW;
+    PyObject* result = hash_ranges(algorithm, data, ranges);
+    io.munmap();
+    io.close();
+    return result;
+};
+}
+%extend Exiv2::Image {
+    %fragment("content_digest");
+    PyObject* content_digest(const char* algorithm) {
+        return image_content_digest(self, algorithm);
+    }
 }
 
 // Convert path encoding on Windows
@@ -174,6 +811,534 @@ Create a MemIo subclass of BasicIo using the provided memory.
     }
 }
 
+// Initialise XMP with a lock function before it can be used by any thread
+%fragment("xmp_lock_init");
+
+// Open and read many image files on a pool of native threads
+%fragment("ImageBatch", "header", fragment="_set_python_exception",
+          fragment="set_EXV_ENABLE_FILESYSTEM", fragment="py_to_path") {
+%#include <condition_variable>
+%#include <deque>
+%#include <exception>
+%#include <mutex>
+%#include <thread>
+%#include <vector>
+
+class ImageBatch {
+private:
+    struct Result {
+        size_t idx;
+        Exiv2::Image* image;
+        std::exception_ptr error;
+    };
+    PyObject* py_paths;
+    std::vector<std::string> paths;
+    std::vector<std::thread> workers;
+    std::deque<Result> done;
+    std::mutex lock;
+    std::condition_variable ready;
+    size_t next_path;
+    size_t returned;
+    bool stopping;
+    void worker() {
+        while (true) {
+            Result result = {0, NULL, nullptr};
+            {
+                std::lock_guard<std::mutex> guard(lock);
+                if (stopping || next_path >= paths.size())
+                    return;
+                result.idx = next_path++;
+            }
+            try {
+%#ifdef EXV_ENABLE_FILESYSTEM
+                auto image = Exiv2::ImageFactory::open(paths[result.idx]);
+                image->readMetadata();
+                result.image = image.release();
+%#else
+                throw Exiv2::Error(Exiv2::ErrorCode::kerFunctionNotSupported);
+%#endif
+            }
+            catch(std::exception const&) {
+                result.error = std::current_exception();
+            }
+            catch(...) {
+                result.error = std::make_exception_ptr(
+                    std::runtime_error("unknown exception"));
+            }
+            {
+                std::lock_guard<std::mutex> guard(lock);
+                done.push_back(result);
+            }
+            ready.notify_one();
+        }
+    };
+    ImageBatch(PyObject* py_paths): py_paths(py_paths), next_path(0),
+                                    returned(0), stopping(false) {}
+    void start(int n_workers) {
+        if (n_workers <= 0)
+            n_workers = std::thread::hardware_concurrency();
+        if (n_workers <= 0)
+            n_workers = 1;
+        if ((size_t)n_workers > paths.size())
+            n_workers = paths.size();
+        for (int i = 0; i < n_workers; i++)
+            workers.emplace_back(&ImageBatch::worker, this);
+    };
+public:
+    // Create a batch from a Python iterable of paths, returns NULL and
+    // sets a Python exception on failure
+    static ImageBatch* create(PyObject* paths, int n_workers) {
+        PyObject* py_paths = PySequence_List(paths);
+        if (!py_paths)
+            return NULL;
+        ImageBatch* batch = new ImageBatch(py_paths);
+        for (Py_ssize_t i = 0; i < PyList_GET_SIZE(py_paths); i++) {
+            std::string path;
+            if (py_to_path(PyList_GET_ITEM(py_paths, i), &path)) {
+                delete batch;
+                return NULL;
+            }
+            batch->paths.push_back(path);
+        }
+        try {
+            batch->start(n_workers);
+        }
+        catch(...) {
+            delete batch;
+            throw;
+        }
+        return batch;
+    };
+    ~ImageBatch() {
+        SWIG_PYTHON_THREAD_BEGIN_ALLOW;
+        {
+            std::lock_guard<std::mutex> guard(lock);
+            stopping = true;
+        }
+        for (auto& worker : workers)
+            worker.join();
+        SWIG_PYTHON_THREAD_END_ALLOW;
+        for (auto& result : done)
+            delete result.image;
+        Py_XDECREF(py_paths);
+    };
+    PyObject* __next__() {
+        Result result = {0, NULL, nullptr};
+        bool finished = false;
+        SWIG_PYTHON_THREAD_BEGIN_ALLOW;
+        {
+            std::unique_lock<std::mutex> guard(lock);
+            ready.wait(guard, [this] {
+                return !done.empty() || returned >= paths.size(); });
+            finished = done.empty();
+            if (!finished) {
+                result = done.front();
+                done.pop_front();
+                returned++;
+            }
+        }
+        SWIG_PYTHON_THREAD_END_ALLOW;
+        if (finished) {
+            PyErr_SetNone(PyExc_StopIteration);
+            return NULL;
+        }
+        PyObject* py_result = NULL;
+        if (result.error) {
+            try {
+                std::rethrow_exception(result.error);
+            }
+            catch(std::exception const&) {
+                _set_python_exception();
+            }
+            PyObject *type, *value, *traceback;
+            PyErr_Fetch(&type, &value, &traceback);
+            PyErr_NormalizeException(&type, &value, &traceback);
+            Py_XDECREF(type);
+            Py_XDECREF(traceback);
+            py_result = value;
+        }
+        else
+            py_result = SWIG_NewPointerObj(
+                result.image, $descriptor(Exiv2::Image*), SWIG_POINTER_OWN);
+        if (!py_result)
+            return NULL;
+        return Py_BuildValue(
+            "(ON)", PyList_GET_ITEM(py_paths, result.idx), py_result);
+    };
+};
+}
+%fragment("ImageBatch");
+
+%feature("docstring") ImageBatch
+"Iterator returned by :meth:`ImageFactory.open_many`.
+
+Yields ``(path, result)`` tuples in the order the files are finished
+with. ``result`` is an :class:`Image` whose metadata has been read, or
+the :class:`Exiv2Error` that was raised when opening or reading it.
+Deleting the iterator stops any files not yet started being opened."
+%feature("python:slot", "tp_iter", functype="getiterfunc")
+    ImageBatch::__iter__;
+%feature("python:slot", "tp_iternext", functype="iternextfunc")
+    ImageBatch::__next__;
+%nodefaultctor ImageBatch;
+%noexception ImageBatch::~ImageBatch;
+%noexception ImageBatch::__iter__;
+%noexception ImageBatch::__next__;
+class ImageBatch {
+public:
+    ~ImageBatch();
+    PyObject* __next__();
+};
+%extend ImageBatch {
+    PyObject* __iter__(PyObject* py_self) {
+        Py_INCREF(py_self);
+        return py_self;
+    }
+}
+
+// Add ImageFactory::open_many() method to read a batch of files
+%feature("docstring") Exiv2::ImageFactory::open_many
+"Open many image files and read their metadata.
+
+The files are opened and read by a pool of native threads, without
+holding the Python global interpreter lock. The result is an iterator
+that yields ``(path, result)`` tuples as each file is finished with.
+``result`` is an :class:`Image` object on success or an
+:class:`Exiv2Error` exception object on failure.
+
+libexiv2's XMP toolkit is initialised with a lock function when the
+exiv2 module is imported, so XMP parsing in the threads is safe.
+
+:type paths: iterable of str, bytes or path-like objects
+:param paths: Image file paths.
+:type workers: int, optional
+:param workers: Number of threads to use. The default is the number
+    of CPU cores.
+:rtype: :py:class:`ImageBatch`"
+%typemap(default) int workers {$1 = 0;}
+%typemap(out) ImageBatch* open_many {
+    if (!$1)
+        SWIG_fail;
+    $result = SWIG_NewPointerObj($1, $1_descriptor, SWIG_POINTER_OWN);
+}
+%extend Exiv2::ImageFactory {
+    static ImageBatch* open_many(PyObject* paths, int workers) {
+        return ImageBatch::create(paths, workers);
+    }
+}
+
+// BasicIo that reads from a Python file-like object. Data is only read
+// when libexiv2 asks for it, apart from mmap() which has to read the lot.
+%fragment("PyFileIo", "header") %{
+#include <algorithm>
+#include <cstring>
+#include <vector>
+
+class PyFileIo : public Exiv2::BasicIo {
+private:
+    PyObject* fileobj_;
+    bool has_readinto_;
+    std::string path_;
+    size_t size_;
+    size_t idx_;
+    size_t py_idx_;
+    bool open_;
+    bool eof_;
+    int error_;
+    std::vector<Exiv2::byte> mapped_;
+
+    // Log a Python exception as an exiv2 error, GIL must be held
+    void set_error() {
+        PyObject *type, *value, *traceback;
+        PyErr_Fetch(&type, &value, &traceback);
+        PyObject* str = value ? PyObject_Str(value) : NULL;
+        const char* msg = str ? PyUnicode_AsUTF8(str) : NULL;
+        PyErr_Clear();
+        Exiv2::LogMsg(Exiv2::LogMsg::error).os() << path_ << ": "
+            << (msg ? msg : "unknown error");
+        Py_XDECREF(str);
+        Py_XDECREF(type);
+        Py_XDECREF(value);
+        Py_XDECREF(traceback);
+        error_ = 1;
+    };
+    // Get size by seeking to the end, GIL must be held
+    int find_size() {
+        PyObject* res = PyObject_CallMethod(fileobj_, "seek", "(ii)", 0, 2);
+        if (!res) {
+            set_error();
+            return 1;
+        }
+        Py_ssize_t end = PyLong_AsSsize_t(res);
+        Py_DECREF(res);
+        if (end < 0) {
+            set_error();
+            return 1;
+        }
+        size_ = end;
+        py_idx_ = end;
+        return 0;
+    };
+    size_t read_into(Exiv2::byte* buf, size_t rcount) {
+        size_t count = 0;
+        if (!rcount)
+            return 0;
+        PyGILState_STATE gstate = PyGILState_Ensure();
+        if (py_idx_ != idx_) {
+            PyObject* res = PyObject_CallMethod(
+                fileobj_, "seek", "(n)", (Py_ssize_t)idx_);
+            if (res) {
+                Py_DECREF(res);
+                py_idx_ = idx_;
+            }
+            else {
+                set_error();
+                rcount = 0;
+            }
+        }
+        while (count < rcount) {
+            Py_ssize_t n = -1;
+            PyObject* res = NULL;
+            if (has_readinto_) {
+                PyObject* view = PyMemoryView_FromMemory(
+                    (char*)buf + count, rcount - count, PyBUF_WRITE);
+                if (view) {
+                    res = PyObject_CallMethod(
+                        fileobj_, "readinto", "(O)", view);
+                    Py_DECREF(view);
+                }
+                if (res) {
+                    n = res == Py_None ? 0 : PyLong_AsSsize_t(res);
+                    Py_DECREF(res);
+                }
+            }
+            else {
+                res = PyObject_CallMethod(
+                    fileobj_, "read", "(n)", (Py_ssize_t)(rcount - count));
+                if (res) {
+                    Py_buffer view;
+                    if (PyObject_GetBuffer(res, &view, PyBUF_SIMPLE) == 0) {
+                        n = std::min(view.len, (Py_ssize_t)(rcount - count));
+                        std::memcpy(buf + count, view.buf, n);
+                        PyBuffer_Release(&view);
+                    }
+                    Py_DECREF(res);
+                }
+            }
+            if (n < 0) {
+                set_error();
+                break;
+            }
+            if (n == 0) {
+                eof_ = true;
+                break;
+            }
+            count += n;
+        }
+        idx_ += count;
+        py_idx_ += count;
+        PyGILState_Release(gstate);
+        return count;
+    };
+public:
+    PyFileIo(PyObject* fileobj): fileobj_(fileobj), size_(0), idx_(0),
+                                 py_idx_(0), open_(false), eof_(false),
+                                 error_(0) {
+        PyGILState_STATE gstate = PyGILState_Ensure();
+        Py_INCREF(fileobj_);
+        has_readinto_ = PyObject_HasAttrString(fileobj_, "readinto");
+        path_ = "<file object>";
+        PyObject* name = PyObject_GetAttrString(fileobj_, "name");
+        if (name && PyUnicode_Check(name)) {
+            // NULL if the name can't be encoded, e.g. has surrogates
+            const char* c_name = PyUnicode_AsUTF8(name);
+            if (c_name)
+                path_ = c_name;
+        }
+        Py_XDECREF(name);
+        PyErr_Clear();
+        find_size();
+        PyGILState_Release(gstate);
+    };
+    ~PyFileIo() {
+        PyGILState_STATE gstate = PyGILState_Ensure();
+        Py_DECREF(fileobj_);
+        PyGILState_Release(gstate);
+    };
+    int open() {
+        PyGILState_STATE gstate = PyGILState_Ensure();
+        int result = find_size();
+        PyGILState_Release(gstate);
+        idx_ = 0;
+        eof_ = false;
+        open_ = result == 0;
+        return result;
+    };
+    int close() {
+        open_ = false;
+        mapped_.clear();
+        return 0;
+    };
+    int putb(Exiv2::byte data) {
+        return EOF;
+    };
+    int getb() {
+        Exiv2::byte data;
+        if (read_into(&data, 1) != 1)
+            return EOF;
+        return data;
+    };
+    void transfer(Exiv2::BasicIo& src) {
+        throw Exiv2::Error(Exiv2::ErrorCode::kerFunctionNotSupported);
+    };
+    Exiv2::byte* mmap(bool isWriteable) {
+        if (isWriteable)
+            throw Exiv2::Error(Exiv2::ErrorCode::kerFunctionNotSupported);
+        if (mapped_.size() != size_) {
+            size_t idx = idx_;
+            mapped_.resize(size_);
+            idx_ = 0;
+            mapped_.resize(read_into(mapped_.data(), size_));
+            idx_ = idx;
+        }
+        return mapped_.data();
+    };
+    int munmap() {
+        mapped_.clear();
+        return 0;
+    };
+    size_t size() const {
+        return size_;
+    };
+    bool isopen() const {
+        return open_;
+    };
+    int error() const {
+        return error_;
+    };
+    bool eof() const {
+        return eof_;
+    };
+    void populateFakeData() {};
+#if EXIV2_TEST_VERSION(0, 28, 0)
+    size_t write(const Exiv2::byte* data, size_t wcount) {
+        return 0;
+    };
+    size_t write(Exiv2::BasicIo& src) {
+        return 0;
+    };
+    Exiv2::DataBuf read(size_t rcount) {
+        Exiv2::DataBuf buf(rcount);
+        buf.resize(read_into(buf.data(), rcount));
+        return buf;
+    };
+    size_t read(Exiv2::byte* buf, size_t rcount) {
+        return read_into(buf, rcount);
+    };
+    int seek(int64_t offset, Exiv2::BasicIo::Position pos) {
+        int64_t new_idx = offset;
+#else
+    long write(const Exiv2::byte* data, long wcount) {
+        return 0;
+    };
+    long write(Exiv2::BasicIo& src) {
+        return 0;
+    };
+    Exiv2::DataBuf read(long rcount) {
+        Exiv2::DataBuf buf(rcount);
+        buf.size_ = read_into(buf.pData_, rcount);
+        return buf;
+    };
+    long read(Exiv2::byte* buf, long rcount) {
+        return read_into(buf, rcount);
+    };
+#if defined(_MSC_VER)
+    int seek(int64_t offset, Exiv2::BasicIo::Position pos) {
+        int64_t new_idx = offset;
+#else
+    int seek(long offset, Exiv2::BasicIo::Position pos) {
+        long new_idx = offset;
+#endif
+#endif
+        if (pos == Exiv2::BasicIo::cur)
+            new_idx += idx_;
+        else if (pos == Exiv2::BasicIo::end)
+            new_idx += size_;
+        if (new_idx < 0)
+            return 1;
+        if ((size_t)new_idx > size_) {
+            eof_ = true;
+            return 1;
+        }
+        idx_ = new_idx;
+        eof_ = false;
+        return 0;
+    };
+#if EXIV2_TEST_VERSION(0, 28, 0)
+    size_t tell() const {
+        return idx_;
+    };
+    const std::string& path() const noexcept {
+        return path_;
+    };
+#else
+    long tell() const {
+        return idx_;
+    };
+    std::string path() const {
+        return path_;
+    };
+#ifdef EXV_UNICODE_PATH
+    std::wstring wpath() const {
+        return std::wstring(path_.begin(), path_.end());
+    };
+#endif
+#endif
+};
+%}
+
+// ImageFactory::open() can read from a Python file-like object
+%typemap(doctype) PyObject* fileobj ":term:`file object`";
+%typemap(typecheck, precedence=SWIG_TYPECHECK_POINTER) PyObject* fileobj %{
+    $1 = (!PyObject_CheckBuffer($input)
+          && PyObject_HasAttrString($input, "read")
+          && PyObject_HasAttrString($input, "seek")) ? 1 : 0;
+%}
+%feature("docstring") Exiv2::ImageFactory::open(PyObject* fileobj)
+"Create an Image from a Python file-like object.
+
+The object must be opened in binary mode and have ``read()`` (or
+``readinto()``) and ``seek()`` methods. Data is only read from the
+object when libexiv2 needs it, so parsing metadata from large files
+(e.g. in an archive or remote object store) does not have to read the
+whole file. Some image formats, such as TIFF based raw files, do need
+the whole file to be read.
+
+The Image keeps a reference to the file object, but does not close it.
+Images opened this way are read only.
+
+:type fileobj: :term:`file object`
+:param fileobj: A readable, seekable binary file object.
+:rtype: :py:class:`Image`"
+%fragment("PyFileIo");
+%extend Exiv2::ImageFactory {
+    static Exiv2::Image::SMART_PTR open(PyObject* fileobj) {
+        PyFileIo* io = new PyFileIo(fileobj);
+        std::string path = io->path();
+#if EXIV2_VERSION_HEX < 0x001c0000
+        Exiv2::Image::AutoPtr image = Exiv2::ImageFactory::open(
+            Exiv2::BasicIo::AutoPtr(io));
+#else
+        Exiv2::Image::UniquePtr image = Exiv2::ImageFactory::open(
+            Exiv2::BasicIo::UniquePtr(io));
+#endif
+        if (!image.get())
+            throw Exiv2::Error(
+                Exiv2::ErrorCode::kerFileContainsUnknownImageType, path);
+        return image;
+    }
+}
+
 // Enable BMFF if libexiv2 was compiled with BMFF support
 %init %{
 #if defined EXV_ENABLE_BMFF && !EXIV2_TEST_VERSION(0, 28, 3)
@@ -216,6 +1381,14 @@ static bool enableBMFF(bool enable) {
 KEEP_REFERENCE(Exiv2::ExifData&)
 KEEP_REFERENCE(Exiv2::IptcData&)
 KEEP_REFERENCE(Exiv2::XmpData&)
+// Lazy XMP mode also needs a weak reference to xmpData() return values
+%typemap(ret, fragment="lazy_xmp") Exiv2::XmpData& xmpData {
+    $typemap(ret, Exiv2::XmpData&)
+    if (lazy_xmp_t* lazy = get_lazy_xmp(self)) {
+        if (store_xmp_ref(lazy, $result))
+            SWIG_fail;
+    }
+}
 KEEP_REFERENCE(Exiv2::DataBuf*)
 KEEP_REFERENCE(Exiv2::DataBuf&)
 
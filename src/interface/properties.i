@@ -24,6 +24,7 @@
 %include "shared/preamble.i"
 %include "shared/static_list.i"
 %include "shared/struct_dict.i"
+%include "shared/xmp_lock.i"
 
 %import "metadatum.i"
 
@@ -49,6 +50,9 @@ if 'sphinx' in sys.modules:
 // Catch all C++ exceptions...
 EXCEPTION()
 
+// Initialise XMP with a lock function before it can be used by any thread
+%fragment("xmp_lock_init");
+
 // ...except these
 %noexception Exiv2::XmpKey::~XmpKey;
 %noexception Exiv2::XmpKey::familyName;
@@ -17,9 +17,294 @@
 
 
 %include "shared/metadatum_wrappers.i"
+%include "shared/python_import.i"
 %include "shared/slots.i"
 
 
+// Functions to convert a container's data to a Python dict
+%fragment("py_from_value", "header", fragment="import_from_python") {
+%#include <cstdarg>
+%#include <cstring>
+%#include <map>
+
+// fractions imports decimal, so it's imported when first needed
+static PyObject* _Fraction = NULL;
+static PyObject* _new_fraction(const char* format, ...) {
+    if (!_Fraction) {
+        _Fraction = import_from_python("fractions", "Fraction");
+        if (!_Fraction)
+            return NULL;
+    }
+    va_list args;
+    va_start(args, format);
+    PyObject* args_tuple = Py_VaBuildValue(format, args);
+    va_end(args);
+    if (!args_tuple)
+        return NULL;
+    PyObject* result = PyObject_CallObject(_Fraction, args_tuple);
+    Py_DECREF(args_tuple);
+    return result;
+};
+
+static PyObject* py_from_item(uint16_t item) {
+    return PyLong_FromUnsignedLong(item);
+};
+static PyObject* py_from_item(int16_t item) {
+    return PyLong_FromLong(item);
+};
+static PyObject* py_from_item(uint32_t item) {
+    return PyLong_FromUnsignedLong(item);
+};
+static PyObject* py_from_item(int32_t item) {
+    return PyLong_FromLong(item);
+};
+static PyObject* py_from_item(float item) {
+    return PyFloat_FromDouble(item);
+};
+static PyObject* py_from_item(double item) {
+    return PyFloat_FromDouble(item);
+};
+static PyObject* py_from_item(const Exiv2::URational& item) {
+    if (!item.second)
+        return Py_BuildValue("(kk)", (unsigned long)item.first,
+                             (unsigned long)item.second);
+    return _new_fraction("(kk)",
+        (unsigned long)item.first, (unsigned long)item.second);
+};
+static PyObject* py_from_item(const Exiv2::Rational& item) {
+    if (!item.second)
+        return Py_BuildValue("(ll)", (long)item.first, (long)item.second);
+    return _new_fraction("(ll)", (long)item.first, (long)item.second);
+};
+static PyObject* py_from_string(const std::string& str) {
+    return PyUnicode_DecodeUTF8(str.data(), str.size(), "surrogateescape");
+};
+// Convert ValueType to a single Python object or a list
+template <typename T>
+static PyObject* py_from_value_type(const Exiv2::ValueType<T>* value) {
+    size_t count = value->value_.size();
+    if (count == 1)
+        return py_from_item(value->value_[0]);
+    PyObject* result = PyList_New(count);
+    if (!result)
+        return NULL;
+    for (size_t i = 0; i < count; i++) {
+        PyObject* item = py_from_item(value->value_[i]);
+        if (!item) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyList_SET_ITEM(result, i, item);
+    }
+    return result;
+};
+// Convert any Exiv2::Value to the most appropriate Python type
+static PyObject* py_from_value(const Exiv2::Value& value) {
+    if (auto ptr = dynamic_cast<const Exiv2::UShortValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::ULongValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::URationalValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::ShortValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::LongValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::RationalValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::FloatValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::DoubleValue*>(&value))
+        return py_from_value_type(ptr);
+    if (auto ptr = dynamic_cast<const Exiv2::CommentValue*>(&value))
+        return py_from_string(ptr->comment());
+    if (auto ptr = dynamic_cast<const Exiv2::LangAltValue*>(&value)) {
+        PyObject* result = PyDict_New();
+        if (!result)
+            return NULL;
+        for (auto& item : ptr->value_) {
+            PyObject* text = py_from_string(item.second);
+            if (!text || PyDict_SetItemString(
+                    result, item.first.c_str(), text)) {
+                Py_XDECREF(text);
+                Py_DECREF(result);
+                return NULL;
+            }
+            Py_DECREF(text);
+        }
+        return result;
+    }
+    if (auto ptr = dynamic_cast<const Exiv2::XmpArrayValue*>(&value)) {
+        PyObject* result = PyList_New(ptr->count());
+        if (!result)
+            return NULL;
+        for (long i = 0; i < (long)ptr->count(); i++) {
+            PyObject* item = py_from_string(ptr->toString(i));
+            if (!item) {
+                Py_DECREF(result);
+                return NULL;
+            }
+            PyList_SET_ITEM(result, i, item);
+        }
+        return result;
+    }
+    if (dynamic_cast<const Exiv2::DataValue*>(&value)) {
+        PyObject* result = PyBytes_FromStringAndSize(NULL, value.size());
+        if (!result)
+            return NULL;
+        value.copy((Exiv2::byte*)PyBytes_AS_STRING(result),
+                   Exiv2::invalidByteOrder);
+        return result;
+    }
+    return py_from_string(value.toString());
+};
+// Exifdatum::print() can use the ExifData it's in
+static const Exiv2::ExifData* print_context(const Exiv2::ExifData* data) {
+    return data;
+};
+template <typename C>
+static const Exiv2::ExifData* print_context(const C* data) {
+    return NULL;
+};
+// Add a key & value to a dict, converting repeated keys to a list
+static int add_dict_item(PyObject* dict,
+                         std::map<std::string, PyObject*>& repeats,
+                         const std::string& key, PyObject* value) {
+    PyObject* old_value = PyDict_GetItemString(dict, key.c_str());
+    if (!old_value)
+        return PyDict_SetItemString(dict, key.c_str(), value);
+    auto repeat = repeats.find(key);
+    if (repeat != repeats.end())
+        return PyList_Append(repeat->second, value);
+    PyObject* list = Py_BuildValue("[OO]", old_value, value);
+    if (!list)
+        return -1;
+    repeats[key] = list;
+    int result = PyDict_SetItemString(dict, key.c_str(), list);
+    Py_DECREF(list);
+    return result;
+};
+template <typename C>
+static PyObject* container_to_dict(C* data, const char* format) {
+    int mode = 0;
+    if (!std::strcmp(format, "typed"))
+        mode = 0;
+    else if (!std::strcmp(format, "string"))
+        mode = 1;
+    else if (!std::strcmp(format, "print"))
+        mode = 2;
+    else
+        return PyErr_Format(PyExc_ValueError,
+                            "unknown to_dict format '%s'", format);
+    PyObject* result = PyDict_New();
+    if (!result)
+        return NULL;
+    std::map<std::string, PyObject*> repeats;
+    try {
+        for (auto datum = data->begin(); datum != data->end(); ++datum) {
+            PyObject* value = NULL;
+            if (mode == 0)
+                value = py_from_value(datum->value());
+            else if (mode == 1)
+                value = py_from_string(datum->toString());
+            else
+                value = py_from_string(datum->print(print_context(data)));
+            if (!value || add_dict_item(result, repeats, datum->key(), value)) {
+                Py_XDECREF(value);
+                Py_DECREF(result);
+                return NULL;
+            }
+            Py_DECREF(value);
+        }
+    }
+    catch(...) {
+        Py_DECREF(result);
+        throw;
+    }
+    return result;
+};
+}
+
+
+// Functions to get a container's raw data as a list of records
+%fragment("container_records", "header",
+          fragment="enum_members"{Exiv2::TypeId}) {
+static PyStructSequence_Field _record_fields[] = {
+    {(char*)"key", (char*)"The datum's key."},
+    {(char*)"typeId", (char*)"The datum's value type."},
+    {(char*)"count", (char*)"The number of components in the value."},
+    {(char*)"data", (char*)"The value's raw data."},
+    {NULL, NULL}
+};
+static PyTypeObject* _record_type = NULL;
+static PyTypeObject* get_record_type(const char* name) {
+    if (!_record_type) {
+        PyStructSequence_Desc desc = {
+            (char*)name, (char*)"Key, type, count and raw data of a datum.",
+            _record_fields, 4};
+        _record_type = PyStructSequence_NewType(&desc);
+    }
+    return _record_type;
+};
+template <typename T>
+static PyObject* _make_record(PyTypeObject* type, T& datum,
+                              Exiv2::ByteOrder byte_order) {
+    PyObject* record = PyStructSequence_New(type);
+    if (!record)
+        return NULL;
+    std::string key = datum.key();
+    PyObject* item = PyUnicode_FromStringAndSize(key.data(), key.size());
+    if (!item)
+        goto fail;
+    PyStructSequence_SET_ITEM(record, 0, item);
+    item = py_from_enum(Members_Exiv2_TypeId, (long)datum.typeId());
+    if (!item)
+        goto fail;
+    PyStructSequence_SET_ITEM(record, 1, item);
+    item = PyLong_FromSize_t(datum.count());
+    if (!item)
+        goto fail;
+    PyStructSequence_SET_ITEM(record, 2, item);
+    item = PyBytes_FromStringAndSize(NULL, datum.size());
+    if (!item)
+        goto fail;
+    PyStructSequence_SET_ITEM(record, 3, item);
+    if (datum.size())
+        datum.value().copy(
+            (Exiv2::byte*)PyBytes_AS_STRING(item), byte_order);
+    return record;
+fail:
+    Py_DECREF(record);
+    return NULL;
+};
+template <typename C>
+static PyObject* container_records(C* data, const char* type_name,
+                                   Exiv2::ByteOrder byte_order) {
+    PyTypeObject* type = get_record_type(type_name);
+    if (!type)
+        return NULL;
+    PyObject* result = PyList_New(data->count());
+    if (!result)
+        return NULL;
+    Py_ssize_t idx = 0;
+    try {
+        for (auto datum = data->begin(); datum != data->end(); ++datum) {
+            PyObject* record = _make_record(type, *datum, byte_order);
+            if (!record) {
+                Py_DECREF(result);
+                return NULL;
+            }
+            PyList_SET_ITEM(result, idx++, record);
+        }
+    }
+    catch(...) {
+        Py_DECREF(result);
+        throw;
+    }
+    return result;
+};
+}
+
 // Macro to wrap data containers.
 %define DATA_CONTAINER(base_class, datum_type, key_type, default_type_func)
 
@@ -89,24 +374,117 @@ static PyObject* set_value_from_py(Exiv2::datum_type* datum,
     Exiv2::base_class::begin;
 %feature("python:slot", "mp_length", functype="lenfunc")
     Exiv2::base_class::count;
-MP_SUBSCRIPT(Exiv2::base_class, Exiv2::datum_type&, (*self)[key])
+// Key lookup uses the key index
+%fragment("find_key"{Exiv2::base_class}, "header", fragment="key_index") {
+static Exiv2::base_class::iterator find_key(
+        PyObject* py_self, Exiv2::base_class* data, const char* key) {
+    Exiv2::base_class::iterator pos = index_find_key(py_self, data, key);
+    if (pos != data->end())
+        return pos;
+    // The key may not be in canonical form
+    std::string canonical = Exiv2::key_type(key).key();
+    if (canonical == key)
+        return pos;
+    return index_find_key(py_self, data, canonical);
+};
+static Exiv2::datum_type& get_datum(
+        PyObject* py_self, Exiv2::base_class* data, const char* key) {
+    Exiv2::base_class::iterator pos = find_key(py_self, data, key);
+    if (pos != data->end())
+        return *pos;
+    // Append a new datum, as operator[] does, without searching again
+    data->add(Exiv2::datum_type(Exiv2::key_type(key)));
+    index_add_new(py_self, data);
+    return *(--data->end());
+};
+}
+%fragment("find_key"{Exiv2::base_class});
+MP_SUBSCRIPT(Exiv2::base_class, Exiv2::datum_type&,
+             get_datum(py_self, self, key))
 %fragment("set_value_from_py"{Exiv2::datum_type});
 #if SWIG_VERSION >= 0x040400
 %fragment("pointer_store");
 #endif
 MP_ASS_SUBSCRIPT(Exiv2::base_class, PyObject*,
 // setfunc
-    return set_value_from_py(&(*self)[key], value),
+    return set_value_from_py(&get_datum(py_self, self, key), value),
 // delfunc
-    auto pos = self->findKey(Exiv2::key_type(key));
+    auto pos = find_key(py_self, self, key);
     if (pos == self->end())
         return PyErr_Format(PyExc_KeyError, "'%s'", key);
 #if SWIG_VERSION >= 0x040400
     invalidate_pointers(py_self, pos);
 #endif
+    index_erase(py_self, self, pos);
     self->erase(pos), false)
-SQ_CONTAINS(
-    Exiv2::base_class, self->findKey(Exiv2::key_type(key)) != self->end())
+SQ_CONTAINS(Exiv2::base_class, find_key(py_self, self, key) != self->end())
+
+// Add to_dict() method to get all the data in one call
+%feature("docstring") Exiv2::base_class::to_dict
+"Return the container's data as a Python dict.
+
+The container is read in one pass, without creating a Python
+:class:`"#datum_type"` object for each datum. Keys that occur more than
+once have their values collected in a list.
+
+The ``format`` parameter chooses how the values are converted:
+
+* ``\"typed\"`` (default) uses native Python types. Numbers are
+  :obj:`int`, :obj:`float` or :class:`fractions.Fraction`, with a
+  :obj:`list` if the value has more than one component. A rational
+  with a zero denominator, which Fraction can't represent, is an
+  ``(numerator, denominator)`` :obj:`tuple` of ints. Undefined
+  data is :obj:`bytes`, XMP arrays are a :obj:`list` of :obj:`str` and
+  LangAlt values are a :obj:`dict`. Everything else is a :obj:`str`.
+* ``\"string\"`` uses the value's ``toString()`` result.
+* ``\"print\"`` uses the datum's interpreted ``print()`` result.
+
+:type format: str, optional
+:param format: The value conversion to use.
+:rtype: dict"
+%typemap(default) const char* format {$1 = (char*)"typed";}
+%extend Exiv2::base_class {
+    %fragment("py_from_value");
+    PyObject* to_dict(const char* format) {
+        return container_to_dict(self, format);
+    }
+}
+
+// Add records() method to get raw data without creating datum objects
+%feature("docstring") Exiv2::base_class::records
+"Return the container's raw data as a list of records.
+
+Each record is a named tuple of ``(key, typeId, count, data)``, where
+``data`` is the :obj:`bytes` produced by the value's ``copy()`` method.
+The records are independent of the container, so they can be kept
+after the container is changed or deleted.
+
+:type byteOrder: :py:class:`ByteOrder`, optional
+:param byteOrder: Byte order of numeric data. Defaults to
+    ``ByteOrder.littleEndian``.
+:rtype: list of :py:class:`"#datum_type"_record`"
+%extend Exiv2::base_class {
+    %fragment("container_records");
+    PyObject* records(Exiv2::ByteOrder byteOrder) {
+        return container_records(
+            self, "exiv2."#datum_type"_record", byteOrder);
+    }
+    PyObject* records() {
+        return container_records(
+            self, "exiv2."#datum_type"_record", Exiv2::littleEndian);
+    }
+}
+
+// Add the record type to the module
+%fragment("record_type"{Exiv2::datum_type}, "init",
+          fragment="container_records") {
+if (!get_record_type("exiv2."#datum_type"_record"))
+    return INIT_ERROR_RETURN;
+// SWIG_Python_SetConstant will decref the type object
+Py_INCREF(_record_type);
+}
+%fragment("record_type"{Exiv2::datum_type});
+%constant PyObject* datum_type##_record = (PyObject*)_record_type;
 
 %extend Exiv2::datum_type {
     %fragment("set_value_from_py"{Exiv2::datum_type});
@@ -26,25 +26,61 @@
 
 
 %fragment("py_from_enum", "header") {
-static PyObject* py_from_enum(PyObject* enum_typeobject, long value) {
-    PyObject* py_int = PyLong_FromLong(value);
-    if (!py_int)
+%#include <unordered_map>
+
+typedef std::unordered_map<long, PyObject*> enum_members_t;
+
+// Make a table of an enum's members during module init. Each module has
+// its own tables, which hold new references to the members and last as
+// long as the module.
+static enum_members_t* _make_enum_members(PyObject* enum_typeobject) {
+    PyObject* iterator = PyObject_GetIter(enum_typeobject);
+    if (!iterator)
+        return NULL;
+    enum_members_t* members = new enum_members_t();
+    PyObject* member;
+    while ((member = PyIter_Next(iterator))) {
+        long value = PyLong_AsLong(member);
+        if (value == -1 && PyErr_Occurred()) {
+            Py_DECREF(member);
+            break;
+        }
+        (*members)[value] = member;
+    }
+    Py_DECREF(iterator);
+    if (PyErr_Occurred()) {
+        for (auto& item : *members)
+            Py_DECREF(item.second);
+        delete members;
         return NULL;
-    PyObject* result = PyObject_CallFunctionObjArgs(
-        enum_typeobject, py_int, NULL);
-    if (!result && PyErr_ExceptionMatches(PyExc_ValueError)) {
-        // Assume value is not currently in enum, so return int
-        PyErr_Clear();
-        return py_int;
     }
-    Py_DECREF(py_int);
-    return result;
+    return members;
+};
+static PyObject* py_from_enum(enum_members_t* members, long value) {
+    auto ptr = members->find(value);
+    if (ptr == members->end())
+        // Value is not currently in enum, so return int
+        return PyLong_FromLong(value);
+    Py_INCREF(ptr->second);
+    return ptr->second;
 };
 }
 
 %define _ENUM_COMMON(pattern)
 DECLARE_IMPORT(pattern)
 IMPORT_PYTHON_OBJECT(enum, IntEnum, enum::IntEnum)
+// table of members, made when the enum is created or imported
+%fragment("declare_enum_members"{pattern}, "header",
+          fragment="py_from_enum") {
+static enum_members_t* Members_%mangle(pattern) = NULL;
+}
+%fragment("enum_members"{pattern}, "init",
+          fragment="declare_enum_members"{pattern},
+          fragment="import_enum"{pattern}) {
+Members_%mangle(pattern) = _make_enum_members(Python_%mangle(pattern));
+if (!Members_%mangle(pattern))
+    return INIT_ERROR_RETURN;
+}
 // typemap to disambiguate enum from int
 %typemap(typecheck, precedence=SWIG_TYPECHECK_POINTER,
          fragment="import_python_object"{enum::IntEnum}) pattern {
@@ -65,9 +101,8 @@ IMPORT_PYTHON_OBJECT(enum, IntEnum, enum::IntEnum)
     $1 = static_cast< $1_type >(PyLong_AsLong($input));
 }
 
-%typemap(out, fragment="py_from_enum",
-         fragment="import_enum"{pattern}) pattern {
-    $result = py_from_enum(Python_%mangle(pattern), static_cast<long>($1));
+%typemap(out, fragment="enum_members"{pattern}) pattern {
+    $result = py_from_enum(Members_%mangle(pattern), static_cast<long>($1));
     if (!$result)
         SWIG_fail;
 }
@@ -134,7 +169,8 @@ _GET_ENUM_FROM_DATA(Exiv2::name, alias_strip)
 // Add enum to module during init
 %constant PyObject* name = Python_%mangle(Exiv2::name);
 %ignore Exiv2::name;
-%fragment("import_enum"{Exiv2::name}, "init") {}
+%fragment("import_enum"{Exiv2::name}, "init",
+          fragment="_store_enum_object"{Exiv2::name}) {}
 %enddef // DEFINE_ENUM
 
 
@@ -142,7 +178,7 @@ _GET_ENUM_FROM_DATA(Exiv2::name, alias_strip)
 %pythoncode %{
 from exiv2.extras import _deprecated_enum
 
-name = _deprecated_enum(#moved_to, moved_to.name)
+_deprecated_enum(globals(), #moved_to, #name)
 %}
 %enddef // DEPRECATED_ENUM
 
@@ -165,5 +201,6 @@ _GET_ENUM_FROM_DATA(Exiv2::class::name, alias_strip)
 %constant PyObject* name = Python_%mangle(Exiv2::class::name);
 }
 %ignore Exiv2::class::name;
-%fragment("import_enum"{Exiv2::class::name}, "init") {}
+%fragment("import_enum"{Exiv2::class::name}, "init",
+          fragment="_store_enum_object"{Exiv2::class::name}) {}
 %enddef // DEFINE_CLASS_ENUM
@@ -34,8 +34,7 @@ IMPORT_MODULE_OBJECT(extras, Exiv2Error)
 // Function that re-raises an exception to handle different types
 %fragment("_set_python_exception", "header",
           fragment="import_module_object"{Exiv2::Exiv2Error},
-          fragment="py_from_enum",
-          fragment="import_enum"{Exiv2::ErrorCode},
+          fragment="enum_members"{Exiv2::ErrorCode},
           fragment="utf8_to_wcp") {
 static void _set_python_exception() {
     try {
@@ -46,7 +45,7 @@ static void _set_python_exception() {
         if (wcp_to_utf8(&msg))
             msg = e.what();
         PyObject* args = Py_BuildValue(
-            "Ns", py_from_enum(Python_%mangle(Exiv2::ErrorCode),
+            "Ns", py_from_enum(Members_%mangle(Exiv2::ErrorCode),
             static_cast<long>(e.code())), msg.c_str());
         PyErr_SetObject(Python_%mangle(Exiv2::Exiv2Error), args);
         Py_DECREF(args);
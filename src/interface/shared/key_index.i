@@ -0,0 +1,235 @@
+// python-exiv2 - Python interface to libexiv2
+// http://github.com/jim-easterbrook/python-exiv2
+// Copyright (C) 2026  Jim Easterbrook  jim@jim-easterbrook.me.uk
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+%include "shared/private_data.i"
+
+
+/* Functions to index the datums in a metadata container by key.
+ *
+ * The index is built on the first key lookup. Each key maps to its
+ * datums, in container order. std::list (ExifData) iterators stay valid
+ * when other datums are added or erased, so they're stored directly.
+ * std::vector (IptcData, XmpData) iterators don't, so positions are stored
+ * instead, and erasing a datum adjusts the positions after it.
+ *
+ * Adding and erasing data via the container updates the index, other
+ * changes drop it. An image's data can be changed by the image's methods
+ * (e.g. Image::readMetadata) so the index of an image's data is stored in
+ * the image's private data. This lets the image drop it, and every Python
+ * object that wraps the same container shares one index.
+ */
+%fragment("key_index", "header", fragment="private_data") {
+%#include <iterator>
+%#include <string>
+%#include <type_traits>
+%#include <unordered_map>
+%#include <vector>
+
+// Name used to store the index in the owner's private data
+template <typename C> struct key_index_name;
+template <> struct key_index_name<Exiv2::ExifData> {
+    static const char* get() { return "exif_key_index"; }
+};
+template <> struct key_index_name<Exiv2::IptcData> {
+    static const char* get() { return "iptc_key_index"; }
+};
+template <> struct key_index_name<Exiv2::XmpData> {
+    static const char* get() { return "xmp_key_index"; }
+};
+
+// Convert between iterators and what's stored in the index
+template <typename C, bool random_access> struct key_locator;
+template <typename C> struct key_locator<C, true> {
+    typedef size_t type;
+    static type make(C* data, typename C::iterator pos) {
+        return std::distance(data->begin(), pos);
+    }
+    static typename C::iterator get(C* data, type loc) {
+        return data->begin() + loc;
+    }
+};
+template <typename C> struct key_locator<C, false> {
+    typedef typename C::iterator type;
+    static type make(C* data, typename C::iterator pos) {
+        return pos;
+    }
+    static typename C::iterator get(C* data, type loc) {
+        return loc;
+    }
+};
+
+template <typename C> struct key_index_t {
+    typedef typename C::iterator iterator;
+    static const bool random_access = std::is_same<
+        typename std::iterator_traits<iterator>::iterator_category,
+        std::random_access_iterator_tag>::value;
+    typedef key_locator<C, random_access> locator;
+    std::unordered_map<std::string, std::vector<typename locator::type> >
+        keys;
+    size_t count;
+    key_index_t(C* data): count(0) {
+        keys.reserve(data->count());
+        add_new(data);
+    }
+    // Add datums appended to the container since the index was updated
+    void add_new(C* data) {
+        size_t new_count = data->count();
+        if (new_count <= count)
+            return;
+        iterator pos = data->end();
+        std::advance(pos, -(std::ptrdiff_t)(new_count - count));
+        for (; pos != data->end(); pos++)
+            keys[pos->key()].push_back(locator::make(data, pos));
+        count = new_count;
+    }
+    iterator find(C* data, const std::string& key) {
+        auto hit = keys.find(key);
+        if (hit == keys.end())
+            return data->end();
+        return locator::get(data, hit->second.front());
+    }
+    // Remove datums from the index before they're erased
+    void erase(C* data, iterator beg, iterator end) {
+        if (beg == end)
+            return;
+        size_t first = random_access ? std::distance(data->begin(), beg) : 0;
+        size_t n_erased = 0;
+        for (iterator pos = beg; pos != end; pos++, n_erased++) {
+            auto hit = keys.find(pos->key());
+            if (hit == keys.end())
+                continue;
+            auto& locs = hit->second;
+            typename locator::type loc = locator::make(data, pos);
+            for (auto it = locs.begin(); it != locs.end(); it++) {
+                if (*it == loc) {
+                    locs.erase(it);
+                    break;
+                }
+            }
+            if (locs.empty())
+                keys.erase(hit);
+        }
+        count -= n_erased;
+        if (!random_access)
+            return;
+        // Later datums move down
+        for (auto& item : keys)
+            for (auto& loc : item.second)
+                _shift(loc, first, n_erased);
+    }
+private:
+    static void _shift(size_t& loc, size_t first, size_t n_erased) {
+        if (loc >= first)
+            loc -= n_erased;
+    }
+    template <typename T>
+    static void _shift(T& loc, size_t first, size_t n_erased) {}
+};
+
+template <typename C>
+static void _delete_key_index(PyObject* capsule) {
+    delete (key_index_t<C>*)PyCapsule_GetPointer(
+        capsule, key_index_name<C>::get());
+};
+// Get the Python object that stores a container's index
+static PyObject* _key_index_owner(PyObject* py_self) {
+    // Only an image's data refers to another object
+    PyObject* image = private_store_get(py_self, "refers_to");
+    return image ? image : py_self;
+};
+template <typename C>
+static key_index_t<C>* _stored_key_index(PyObject* owner) {
+    PyObject* capsule = private_store_get(owner, key_index_name<C>::get());
+    if (!capsule)
+        return NULL;
+    return (key_index_t<C>*)PyCapsule_GetPointer(
+        capsule, key_index_name<C>::get());
+};
+template <typename C>
+static void drop_key_index(PyObject* py_self) {
+    private_store_del(_key_index_owner(py_self), key_index_name<C>::get());
+};
+// Drop the indexes of an image's data, when an image method changes it
+static int drop_image_key_indexes(PyObject* image) {
+    if (private_store_del(image, key_index_name<Exiv2::ExifData>::get()))
+        return -1;
+    if (private_store_del(image, key_index_name<Exiv2::IptcData>::get()))
+        return -1;
+    return private_store_del(image, key_index_name<Exiv2::XmpData>::get());
+};
+template <typename C>
+static key_index_t<C>* _get_key_index(PyObject* py_self, C* data) {
+    PyObject* owner = _key_index_owner(py_self);
+    key_index_t<C>* index = _stored_key_index<C>(owner);
+    // Catch any other change that's added or removed data
+    if (index && index->count == (size_t)data->count())
+        return index;
+    key_index_t<C>* new_index = new key_index_t<C>(data);
+    PyObject* capsule = PyCapsule_New(
+        new_index, key_index_name<C>::get(), _delete_key_index<C>);
+    if (!capsule) {
+        delete new_index;
+        return NULL;
+    }
+    int error = private_store_set(owner, key_index_name<C>::get(), capsule);
+    Py_DECREF(capsule);
+    if (error)
+        return NULL;
+    return new_index;
+};
+// Look up a key, return data->end() if not found. key must be in the
+// canonical form returned by datum.key().
+template <typename C>
+static typename C::iterator index_find_key(
+        PyObject* py_self, C* data, const std::string& key) {
+    key_index_t<C>* index = _get_key_index(py_self, data);
+    if (index)
+        return index->find(data, key);
+    PyErr_Clear();
+    for (typename C::iterator pos = data->begin(); pos != data->end(); pos++)
+        if (pos->key() == key)
+            return pos;
+    return data->end();
+};
+// Add data appended to the container, e.g. by add()
+template <typename C>
+static void index_add_new(PyObject* py_self, C* data) {
+    key_index_t<C>* index = _stored_key_index<C>(_key_index_owner(py_self));
+    if (index)
+        index->add_new(data);
+};
+// Remove data from the index before it's erased from the container
+template <typename C>
+static void index_erase(PyObject* py_self, C* data, typename C::iterator beg,
+                        typename C::iterator end) {
+    key_index_t<C>* index = _stored_key_index<C>(_key_index_owner(py_self));
+    if (!index)
+        return;
+    if (index->count == (size_t)data->count())
+        index->erase(data, beg, end);
+    else
+        drop_key_index<C>(py_self);
+};
+template <typename C>
+static void index_erase(PyObject* py_self, C* data,
+                        typename C::iterator pos) {
+    typename C::iterator end = pos;
+    end++;
+    index_erase(py_self, data, pos, end);
+};
+}
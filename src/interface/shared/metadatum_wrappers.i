@@ -100,7 +100,7 @@ Return the :class:`"#datum_type"` object being pointed to."
         $descriptor(container_type##_iterator*), SWIG_POINTER_OWN);
 #if SWIG_VERSION >= 0x040400
     // Keep weak reference to the Python iterator
-    if (store_pointer(self, $result)) {
+    if (store_pointer(self, $result, NULL)) {
         SWIG_fail;
     }
 #endif // SWIG_VERSION
@@ -111,7 +111,7 @@ Return the :class:`"#datum_type"` object being pointed to."
         $descriptor(datum_type##_reference*), SWIG_POINTER_OWN);
 #if SWIG_VERSION >= 0x040400
     // Keep weak reference to the Python result
-    if (store_pointer(self, $result)) {
+    if (store_pointer(self, $result, $1)) {
         SWIG_fail;
     }
 #endif // SWIG_VERSION
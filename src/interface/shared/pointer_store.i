@@ -16,120 +16,242 @@
 // along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+%include "shared/key_index.i"
 %include "shared/private_data.i"
 
 
+#if SWIG_VERSION >= 0x040400
+/* Functions to store weak references to pointers (swig >= v4.4)
+ *
+ * References to a datum are indexed by the datum's address, so deleting
+ * a datum only has to look at the references to it. Iterators can move,
+ * so they're kept in a separate list. Dead weak references are purged
+ * when the number stored has doubled, which keeps the average cost of
+ * storing a pointer constant.
+ */
+%fragment("pointer_store_base", "header", fragment="private_data") {
+%#include <algorithm>
+%#include <unordered_map>
+%#include <unordered_set>
+%#include <vector>
+
+struct pointer_store_t {
+    std::unordered_map<const void*, std::vector<PyObject*> > references;
+    std::vector<PyObject*> iterators;
+    size_t count;
+    size_t purge_at;
+    pointer_store_t(): count(0), purge_at(16) {}
+    ~pointer_store_t() {
+        for (auto& item : references)
+            for (PyObject* ref : item.second)
+                Py_DECREF(ref);
+        for (PyObject* ref : iterators)
+            Py_DECREF(ref);
+    }
+};
+static void _delete_pointer_store(PyObject* capsule) {
+    delete (pointer_store_t*)PyCapsule_GetPointer(capsule, "pointers");
+};
+static pointer_store_t* _get_pointer_store(PyObject* py_self, bool create) {
+    PyObject* capsule = private_store_get(py_self, "pointers");
+    if (capsule)
+        return (pointer_store_t*)PyCapsule_GetPointer(capsule, "pointers");
+    if (!create)
+        return NULL;
+    pointer_store_t* store = new pointer_store_t();
+    capsule = PyCapsule_New(store, "pointers", _delete_pointer_store);
+    if (!capsule) {
+        delete store;
+        return NULL;
+    }
+    int error = private_store_set(py_self, "pointers", capsule);
+    Py_DECREF(capsule);
+    if (error)
+        return NULL;
+    return store;
+};
+// Remove dead weak references from a list, return number removed
+static size_t _purge_list(std::vector<PyObject*>& refs) {
+    size_t out = 0;
+    for (size_t in = 0; in < refs.size(); in++) {
+        if (PyWeakref_GetObject(refs[in]) == Py_None)
+            Py_DECREF(refs[in]);
+        else
+            refs[out++] = refs[in];
+    }
+    size_t result = refs.size() - out;
+    refs.resize(out);
+    return result;
+};
+static void _purge_pointers(pointer_store_t* store) {
+    for (auto item = store->references.begin();
+         item != store->references.end(); ) {
+        store->count -= _purge_list(item->second);
+        if (item->second.empty())
+            item = store->references.erase(item);
+        else
+            item++;
+    }
+    store->count -= _purge_list(store->iterators);
+    store->purge_at = std::max(store->count * 2, (size_t)16);
+};
+// Store a weak reference to a datum reference, or to an iterator if datum
+// is NULL
+static int store_pointer(PyObject* py_self, PyObject* py_ptr,
+                         const void* datum) {
+    pointer_store_t* store = _get_pointer_store(py_self, true);
+    if (!store)
+        return -1;
+    if (store->count >= store->purge_at)
+        _purge_pointers(store);
+    PyObject* ref = PyWeakref_NewRef(py_ptr, NULL);
+    if (!ref)
+        return -1;
+    if (datum)
+        store->references[datum].push_back(ref);
+    else
+        store->iterators.push_back(ref);
+    store->count++;
+    return 0;
+};
+}
+#endif // SWIG_VERSION
+
+
 // Macro to store weak references to pointers and invalidate the
-// pointers when data is deleted
+// pointers (and key index) when data is deleted
 %define POINTER_STORE(container_type, datum_type)
 
 #if SWIG_VERSION >= 0x040400
-// Functions to store weak references to pointers (swig >= v4.4)
-%fragment("pointer_store", "header", fragment="private_data") {
-static void _process_list(PyObject* list, bool purge_only,
-                          Exiv2::container_type::iterator* beg,
-                          Exiv2::container_type::iterator* end) {
-    PyObject* py_ptr = NULL;
+// Functions to invalidate pointers when data is deleted (swig >= v4.4)
+%fragment("pointer_store", "header", fragment="pointer_store_base") {
+// Invalidate all the live pointers in a list
+static void _invalidate_list(std::vector<PyObject*>& refs) {
     datum_type##_pointer* cpp_ptr = NULL;
-    for (Py_ssize_t idx = PyList_Size(list); idx > 0; idx--) {
-        py_ptr = PyWeakref_GetObject(PyList_GetItem(list, idx-1));
-        if (py_ptr == Py_None)
-            goto forget;
-        if (purge_only)
-            continue;
-        if (SWIG_IsOK(SWIG_ConvertPtr(py_ptr, (void**)&cpp_ptr,
-                $descriptor(datum_type##_pointer*), 0))) {
-            if (!beg) {
-                cpp_ptr->_invalidate();
-                goto forget;
+    for (PyObject* ref : refs) {
+        PyObject* py_ptr = PyWeakref_GetObject(ref);
+        if (py_ptr != Py_None && SWIG_IsOK(SWIG_ConvertPtr(
+                py_ptr, (void**)&cpp_ptr,
+                $descriptor(datum_type##_pointer*), 0)))
+            cpp_ptr->_invalidate();
+    }
+};
+// Invalidate and forget the references to one datum
+static void _invalidate_references(pointer_store_t* store,
+                                   const void* datum) {
+    auto item = store->references.find(datum);
+    if (item == store->references.end())
+        return;
+    _invalidate_list(item->second);
+    for (PyObject* ref : item->second)
+        Py_DECREF(ref);
+    store->count -= item->second.size();
+    store->references.erase(item);
+};
+// Invalidate and forget iterators that point to deleted data
+static void _invalidate_iterators(pointer_store_t* store,
+                                  std::unordered_set<const void*>& deleted) {
+    std::vector<PyObject*>& refs = store->iterators;
+    container_type##_iterator* cpp_ptr = NULL;
+    size_t out = 0;
+    for (size_t in = 0; in < refs.size(); in++) {
+        PyObject* py_ptr = PyWeakref_GetObject(refs[in]);
+        if (py_ptr != Py_None && SWIG_IsOK(SWIG_ConvertPtr(
+                py_ptr, (void**)&cpp_ptr,
+                $descriptor(container_type##_iterator*), 0)) &&
+                !cpp_ptr->_invalidated()) {
+            if (!deleted.count(**cpp_ptr)) {
+                refs[out++] = refs[in];
+                continue;
             }
-            for (Exiv2::container_type::iterator it=*beg; it!=*end; it++)
-                if (cpp_ptr->_invalidate(*it))
-                    goto forget;
+            cpp_ptr->_invalidate();
         }
-        continue;
-forget:
-        PyList_SetSlice(list, idx-1, idx, NULL);
-        continue;
+        Py_DECREF(refs[in]);
     }
-};
-static void purge_pointers(PyObject* list) {
-    _process_list(list, true, NULL, NULL);
+    store->count -= refs.size() - out;
+    refs.resize(out);
 };
 static void invalidate_pointers(PyObject* py_self) {
-    PyObject* list = private_store_get(py_self, "pointers");
-    if (list)
-        _process_list(list, false, NULL, NULL);
-};
-static void invalidate_pointers(PyObject* py_self,
-                                Exiv2::container_type::iterator pos) {
-    PyObject* list = private_store_get(py_self, "pointers");
-    if (list) {
-        Exiv2::container_type::iterator end = pos;
-        end++;
-        _process_list(list, false, &pos, &end);
-    }
+    pointer_store_t* store = _get_pointer_store(py_self, false);
+    if (!store)
+        return;
+    for (auto& item : store->references)
+        _invalidate_list(item.second);
+    _invalidate_list(store->iterators);
+    private_store_del(py_self, "pointers");
 };
 static void invalidate_pointers(PyObject* py_self,
                                 Exiv2::container_type::iterator beg,
                                 Exiv2::container_type::iterator end) {
-    PyObject* list = private_store_get(py_self, "pointers");
-    if (list)
-        _process_list(list, false, &beg, &end);
-};
-static int store_pointer(PyObject* py_self, PyObject* py_ptr) {
-    PyObject* list = private_store_get(py_self, "pointers");
-    if (list)
-        purge_pointers(list);
-    else {
-        list = PyList_New(0);
-        if (!list)
-            return -1;
-        int error = private_store_set(py_self, "pointers", list);
-        Py_DECREF(list);
-        if (error)
-            return -1;
+    pointer_store_t* store = _get_pointer_store(py_self, false);
+    if (!store)
+        return;
+    std::unordered_set<const void*> deleted;
+    for (Exiv2::container_type::iterator it = beg; it != end; it++) {
+        _invalidate_references(store, &*it);
+        deleted.insert(&*it);
     }
-    PyObject* ref = PyWeakref_NewRef(py_ptr, NULL);
-    if (!ref)
-        return -1;
-    int result = PyList_Append(list, ref);
-    Py_DECREF(ref);
-    return result;
+    _invalidate_iterators(store, deleted);
+};
+static void invalidate_pointers(PyObject* py_self,
+                                Exiv2::container_type::iterator pos) {
+    Exiv2::container_type::iterator end = pos;
+    end++;
+    invalidate_pointers(py_self, pos, end);
 };
 }
 #endif
 
 #if SWIG_VERSION < 0x040400
 // erase() and eraseFamily() invalidate the iterator passed to them
-%typemap(check) (Exiv2::container_type::iterator pos),
-                (Exiv2::container_type::iterator beg) {
+%typemap(check, fragment="key_index")
+        (Exiv2::container_type::iterator pos) {
     argp$argnum->_invalidate();
+    index_erase(self, arg1, $1);
 }
-%typemap(check) Exiv2::container_type::iterator& {
+%typemap(check, fragment="key_index")
+        (Exiv2::container_type::iterator beg),
+        Exiv2::container_type::iterator& {
     argp$argnum->_invalidate();
+    drop_key_index<Exiv2::container_type>(self);
+}
+// clear() invalidates the key index
+%typemap(ret, fragment="key_index") void clear {
+    drop_key_index<Exiv2::container_type>(self);
 }
 #endif
 
 #if SWIG_VERSION >= 0x040400
 // clear() invalidates all pointers
-%typemap(ret, fragment="pointer_store") void clear {
+%typemap(ret, fragment="pointer_store", fragment="key_index") void clear {
     invalidate_pointers(self);
+    drop_key_index<Exiv2::container_type>(self);
 }
 // erase() and eraseFamily() invalidate some pointers
-%typemap(check, fragment="pointer_store")
+%typemap(check, fragment="pointer_store", fragment="key_index")
         Exiv2::container_type::iterator pos {
     invalidate_pointers(self, $1);
+    index_erase(self, arg1, $1);
 }
-%typemap(check, fragment="pointer_store")
+%typemap(check, fragment="pointer_store", fragment="key_index")
         (Exiv2::container_type::iterator beg,
          Exiv2::container_type::iterator end) {
     invalidate_pointers(self, $1, $2);
+    index_erase(self, arg1, $1, $2);
 }
-%typemap(check, fragment="pointer_store")
+%typemap(check, fragment="pointer_store", fragment="key_index")
         Exiv2::container_type::iterator& pos {
     invalidate_pointers(self, *$1, arg1->end());
+    drop_key_index<Exiv2::container_type>(self);
 }
 #endif // SWIG_VERSION
 
+// add() appends to the container, sortByKey() etc. reorder it
+%typemap(ret, fragment="key_index") void add, int add {
+    index_add_new(self, arg1);
+}
+%typemap(ret, fragment="key_index") void sortByKey, void sortByTag {
+    drop_key_index<Exiv2::container_type>(self);
+}
+
 %enddef // POINTER_STORE
@@ -1,6 +1,6 @@
 // python-exiv2 - Python interface to libexiv2
 // http://github.com/jim-easterbrook/python-exiv2
-// Copyright (C) 2025  Jim Easterbrook  jim@jim-easterbrook.me.uk
+// Copyright (C) 2025-26  Jim Easterbrook  jim@jim-easterbrook.me.uk
 //
 // This program is free software: you can redistribute it and/or modify
 // it under the terms of the GNU General Public License as published by
@@ -16,23 +16,69 @@
 // along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-// Functions to store and retrieve "private" data attached to Pyhon object
+/* Functions to store and retrieve "private" data attached to Pyhon object
+ *
+ * The data is a dict stored in the object's instance dict. SWIG's builtin
+ * types have a slot for the instance dict, which we use directly rather
+ * than going through Python's attribute lookup. Names are converted to
+ * interned Python strings once, and cached by the address of the C string.
+ * (All the names are string literals.)
+ */
 %fragment("private_data", "header") {
+%#include <unordered_map>
+
+static PyObject* _private_key(const char* name) {
+    // Return a borrowed reference
+    static std::unordered_map<const char*, PyObject*> keys;
+    auto item = keys.find(name);
+    if (item != keys.end())
+        return item->second;
+    PyObject* key = PyUnicode_InternFromString(name);
+    if (key)
+        keys[name] = key;
+    return key;
+};
 static PyObject* _get_store(PyObject* py_self, bool create) {
     // Return a borrowed reference
+    PyObject* store_key = _private_key("_private_data_");
+    if (!store_key)
+        return NULL;
     PyObject* dict = NULL;
-    if (!PyObject_HasAttrString(py_self, "_private_data_")) {
+    Py_ssize_t offset = Py_TYPE(py_self)->tp_dictoffset;
+    if (offset > 0) {
+        PyObject** dict_ptr = (PyObject**)((char*)py_self + offset);
+        if (!*dict_ptr) {
+            if (!create)
+                return NULL;
+            *dict_ptr = PyDict_New();
+            if (!*dict_ptr)
+                return NULL;
+        }
+        dict = PyDict_GetItem(*dict_ptr, store_key);
+        if (dict || !create)
+            return dict;
+        dict = PyDict_New();
+        if (!dict)
+            return NULL;
+        int error = PyDict_SetItem(*dict_ptr, store_key, dict);
+        Py_DECREF(dict);
+        if (error)
+            return NULL;
+        return dict;
+    }
+    // Fall back to attribute access
+    if (!PyObject_HasAttr(py_self, store_key)) {
         if (!create)
             return NULL;
         dict = PyDict_New();
         if (!dict)
             return NULL;
-        int error = PyObject_SetAttrString(py_self, "_private_data_", dict);
+        int error = PyObject_SetAttr(py_self, store_key, dict);
         Py_DECREF(dict);
         if (error)
             return NULL;
     }
-    dict = PyObject_GetAttrString(py_self, "_private_data_");
+    dict = PyObject_GetAttr(py_self, store_key);
     Py_DECREF(dict);
     return dict;
 };
@@ -41,21 +87,30 @@ static int private_store_set(PyObject* py_self, const char* name,
     PyObject* dict = _get_store(py_self, true);
     if (!dict)
         return -1;
-    return PyDict_SetItemString(dict, name, val);
+    PyObject* key = _private_key(name);
+    if (!key)
+        return -1;
+    return PyDict_SetItem(dict, key, val);
 };
 static PyObject* private_store_get(PyObject* py_self, const char* name) {
     // Return a borrowed reference
     PyObject* dict = _get_store(py_self, false);
     if (!dict)
         return NULL;
-    return PyDict_GetItemString(dict, name);
+    PyObject* key = _private_key(name);
+    if (!key)
+        return NULL;
+    return PyDict_GetItem(dict, key);
 };
 static int private_store_del(PyObject* py_self, const char* name) {
     PyObject* dict = _get_store(py_self, false);
     if (!dict)
         return 0;
-    if (PyDict_GetItemString(dict, name))
-        return PyDict_DelItemString(dict, name);
+    PyObject* key = _private_key(name);
+    if (!key)
+        return -1;
+    if (PyDict_GetItem(dict, key))
+        return PyDict_DelItem(dict, key);
     return 0;
 };
 }
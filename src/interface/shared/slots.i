@@ -1,6 +1,6 @@
 /* python-exiv2 - Python interface to libexiv2
  * http://github.com/jim-easterbrook/python-exiv2
- * Copyright (C) 2025  Jim Easterbrook  jim@jim-easterbrook.me.uk
+ * Copyright (C) 2025-26  Jim Easterbrook  jim@jim-easterbrook.me.uk
  *
  * This file is part of python-exiv2.
  *
@@ -19,6 +19,46 @@
  */
 
 
+/* The slot functions call SWIG generated wrappers, so SWIG does all the
+ * type conversions. The "self" parameter of each wrapped function is
+ * taken from the wrapper's own "self" (see SELF_FROM_WRAPPER) so it's not
+ * in the argument list. A function with one argument is then wrapped with
+ * METH_O and can be called without building an argument tuple.
+ */
+%define SELF_FROM_WRAPPER(type)
+%typemap(in, numinputs=0) type* self {
+    if (!SWIG_IsOK(SWIG_ConvertPtr(self, (void**)&$1, $descriptor(type*), 0)))
+        SWIG_exception_fail(SWIG_TypeError,
+            "in method '$symname', invalid 'self' argument");
+}
+%enddef // SELF_FROM_WRAPPER
+
+/* Call a SWIG wrapper of a function with one argument. If swig is run
+ * with -nofastunpack (see utils/build_swig.py) the function isn't wrapped
+ * with METH_O, so the argument has to be packed in a tuple.
+ */
+#ifdef NOFASTUNPACK
+%fragment("call_wrapper_o", "header") {
+static PyObject* call_wrapper_o(PyObject* (*wrapper)(PyObject*, PyObject*),
+                                PyObject* self, PyObject* arg) {
+    PyObject* args = PyTuple_Pack(1, arg);
+    if (!args)
+        return NULL;
+    PyObject* result = wrapper(self, args);
+    Py_DECREF(args);
+    return result;
+};
+}
+#else
+%fragment("call_wrapper_o", "header") {
+static PyObject* call_wrapper_o(PyObject* (*wrapper)(PyObject*, PyObject*),
+                                PyObject* self, PyObject* arg) {
+    return wrapper(self, arg);
+};
+}
+#endif // NOFASTUNPACK
+
+
 // Macro to add mp_ass_subscript slot and functions
 %define MP_ASS_SUBSCRIPT(type, item_type, setfunc, delfunc, canfail)
 // Use %inline so SWIG generates wrappers with type conversions.
@@ -27,6 +67,7 @@
 %noexception _setitem_%mangle(type);
 %noexception _delitem_%mangle(type);
 #endif
+SELF_FROM_WRAPPER(type)
 %inline %{
 static PyObject* _setitem_%mangle(type)(
         type* self, char* key, item_type value, PyObject* py_self) {
@@ -39,23 +80,24 @@ static PyObject* _delitem_%mangle(type)(
     return SWIG_Py_Void();
 };
 %}
-%fragment("setitem"{type}, "header") {
+%typemap(in) type* self;
+%fragment("setitem"{type}, "header", fragment="call_wrapper_o") {
 extern "C" {
 static PyObject* _wrap__setitem_%mangle(type)(PyObject*, PyObject*);
 static PyObject* _wrap__delitem_%mangle(type)(PyObject*, PyObject*);
 }
 static int _setitem_%mangle(type)_closure(
         PyObject* self, PyObject* key, PyObject* value) {
-    PyObject* args;
     PyObject* result;
     if (value) {
-        args = Py_BuildValue("(OOO)", self, key, value);
+        PyObject* args = PyTuple_Pack(2, key, value);
+        if (!args)
+            return -1;
         result = _wrap__setitem_%mangle(type)(self, args);
-    } else {
-        args = Py_BuildValue("(OO)", self, key);
-        result = _wrap__delitem_%mangle(type)(self, args);
-    }
-    Py_DECREF(args);
+        Py_DECREF(args);
+    } else
+        result = call_wrapper_o(
+            _wrap__delitem_%mangle(type), self, key);
     if (!result)
         return -1;
     Py_DECREF(result);
@@ -72,21 +114,21 @@ static int _setitem_%mangle(type)_closure(
 // Use %inline so SWIG generates a wrapper with type conversions.
 // Name starts with '_' so it's invisible in normal use.
 %noexception _getitem_%mangle(type);
+SELF_FROM_WRAPPER(type)
 %inline %{
-static item_type _getitem_%mangle(type)(type* self, char* key) {
+static item_type _getitem_%mangle(type)(
+        type* self, char* key, PyObject* py_self) {
     return func;
 };
 %}
-%fragment("getitem"{type}, "header") {
+%typemap(in) type* self;
+%fragment("getitem"{type}, "header", fragment="call_wrapper_o") {
 extern "C" {
 static PyObject* _wrap__getitem_%mangle(type)(PyObject*, PyObject*);
 }
 static PyObject* _getitem_%mangle(type)_closure(
         PyObject* self, PyObject* key) {
-    PyObject* args = Py_BuildValue("(OO)", self, key);
-    PyObject* result = _wrap__getitem_%mangle(type)(self, args);
-    Py_DECREF(args);
-    return result;
+    return call_wrapper_o(_wrap__getitem_%mangle(type), self, key);
 };
 }
 %fragment("getitem"{type});
@@ -100,6 +142,7 @@ static PyObject* _getitem_%mangle(type)_closure(
 // Names start with '_' so it's invisible in normal use.
 %noexception _setitem_%mangle(type);
 %noexception _delitem_%mangle(type);
+SELF_FROM_WRAPPER(type)
 %inline %{
 static PyObject* _setitem_%mangle(type)(
         type* self, size_t idx, item_type value, PyObject* py_self) {
@@ -112,23 +155,30 @@ static PyObject* _delitem_%mangle(type)(
     return SWIG_Py_Void();
 };
 %}
-%fragment("setitem"{type}, "header") {
+%typemap(in) type* self;
+%fragment("setitem"{type}, "header", fragment="call_wrapper_o") {
 extern "C" {
 static PyObject* _wrap__setitem_%mangle(type)(PyObject*, PyObject*);
 static PyObject* _wrap__delitem_%mangle(type)(PyObject*, PyObject*);
 }
 static int _setitem_%mangle(type)_closure(
         PyObject* self, Py_ssize_t idx, PyObject* value) {
-    PyObject* args;
+    PyObject* py_idx = PyLong_FromSsize_t(idx);
+    if (!py_idx)
+        return -1;
     PyObject* result;
     if (value) {
-        args = Py_BuildValue("(OnO)", self, idx, value);
+        PyObject* args = PyTuple_Pack(2, py_idx, value);
+        Py_DECREF(py_idx);
+        if (!args)
+            return -1;
         result = _wrap__setitem_%mangle(type)(self, args);
+        Py_DECREF(args);
     } else {
-        args = Py_BuildValue("(On)", self, idx);
-        result = _wrap__delitem_%mangle(type)(self, args);
+        result = call_wrapper_o(
+            _wrap__delitem_%mangle(type), self, py_idx);
+        Py_DECREF(py_idx);
     }
-    Py_DECREF(args);
     if (!result)
         return -1;
     Py_DECREF(result);
@@ -176,20 +226,25 @@ static Py_ssize_t _len_%mangle(type)(PyObject* py_self) {
 // Use %inline so SWIG generates a wrapper with type conversions.
 // Name starts with '_' so it's invisible in normal use.
 %noexception _getitem_%mangle(type);
+SELF_FROM_WRAPPER(type)
 %inline %{
 static item_type _getitem_%mangle(type)(type* self, size_t idx) {
     return func;
 };
 %}
-%fragment("getitem"{type}, "header") {
+%typemap(in) type* self;
+%fragment("getitem"{type}, "header", fragment="call_wrapper_o") {
 extern "C" {
 static PyObject* _wrap__getitem_%mangle(type)(PyObject*, PyObject*);
 }
 static PyObject* _getitem_%mangle(type)_closure(
         PyObject* self, Py_ssize_t idx) {
-    PyObject* args = Py_BuildValue("(On)", self, idx);
-    PyObject* result = _wrap__getitem_%mangle(type)(self, args);
-    Py_DECREF(args);
+    PyObject* py_idx = PyLong_FromSsize_t(idx);
+    if (!py_idx)
+        return NULL;
+    PyObject* result = call_wrapper_o(
+        _wrap__getitem_%mangle(type), self, py_idx);
+    Py_DECREF(py_idx);
     return result;
 };
 }
@@ -100,3 +100,42 @@ static int wcp_to_utf8(std::string *str) {
     $typemap(out, const std::string&)
 }
 %enddef // WINDOWS_PATH_OUT
+
+// Convert a Python str, bytes or path-like object to a path for libexiv2.
+// Returns -1 with a Python exception set on failure.
+%fragment("py_to_path", "header", fragment="utf8_to_wcp") {
+static int py_to_path(PyObject* py_path, std::string* path) {
+    PyObject* bytes = NULL;
+    if (!PyUnicode_FSConverter(py_path, &bytes))
+        return -1;
+    path->assign(PyBytes_AS_STRING(bytes), PyBytes_GET_SIZE(bytes));
+    Py_DECREF(bytes);
+%#ifdef _WIN32
+    int error = utf8_to_wcp(path);
+    if (error) {
+        PyErr_SetFromWindowsErr(error);
+        return -1;
+    }
+%#endif
+    return 0;
+};
+}
+
+// Replace a file with another, e.g. a temporary file written alongside it.
+// Paths are in the current Windows code page, as used by libexiv2.
+%fragment("replace_file", "header", fragment="utf8_to_wcp") {
+%#include <cstdio>
+static void replace_file(const std::string& src, const std::string& dst) {
+%#ifdef _WIN32
+    if (MoveFileExA(src.c_str(), dst.c_str(), MOVEFILE_REPLACE_EXISTING))
+        return;
+%#else
+    if (std::rename(src.c_str(), dst.c_str()) == 0)
+        return;
+%#endif
+    std::string error = Exiv2::strError();
+    std::remove(src.c_str());
+    throw Exiv2::Error(Exiv2::ErrorCode::kerFileRenameFailed,
+                       src, dst, error);
+};
+}
@@ -0,0 +1,36 @@
+// python-exiv2 - Python interface to libexiv2
+// http://github.com/jim-easterbrook/python-exiv2
+// Copyright (C) 2026  Jim Easterbrook  jim@jim-easterbrook.me.uk
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+// libexiv2's XMP toolkit is only thread safe if it's given a lock function
+// when it's initialised, and it ignores the lock function if it's already
+// initialised. Every module that can use the toolkit initialises it when
+// the module is imported, before any XMP can be parsed.
+%fragment("xmp_lock", "header") {
+%#include <mutex>
+
+static std::mutex _xmp_mutex;
+static void _xmp_lock(void* pLockData, bool lockUnlock) {
+    if (lockUnlock)
+        ((std::mutex*)pLockData)->lock();
+    else
+        ((std::mutex*)pLockData)->unlock();
+};
+}
+%fragment("xmp_lock_init", "init", fragment="xmp_lock") {
+Exiv2::XmpParser::initialize(_xmp_lock, &_xmp_mutex);
+}
@@ -255,6 +255,198 @@ DEPRECATE_FUNCTION(Exiv2::Value::read(const byte*, long, ByteOrder), true)
 DEPRECATE_FUNCTION(Exiv2::Value::read(const byte*, size_t, ByteOrder), true)
 DEPRECATE_FUNCTION(Exiv2::Value::write, true)
 
+// Function to get a memoryview of a ValueType's data
+%fragment("value_type_view", "header", fragment="memoryview_funcs") {
+static_assert(sizeof(Exiv2::URational) == 2 * sizeof(uint32_t),
+              "URational is not a pair of uint32_t");
+static_assert(sizeof(Exiv2::Rational) == 2 * sizeof(int32_t),
+              "Rational is not a pair of int32_t");
+// struct module format and number of parts for each item type
+static const char* _view_format(const uint16_t*) { return "H"; };
+static const char* _view_format(const int16_t*) { return "h"; };
+static const char* _view_format(const uint32_t*) { return "I"; };
+static const char* _view_format(const int32_t*) { return "i"; };
+static const char* _view_format(const float*) { return "f"; };
+static const char* _view_format(const double*) { return "d"; };
+static const char* _view_format(const Exiv2::URational*) { return "I"; };
+static const char* _view_format(const Exiv2::Rational*) { return "i"; };
+template <typename T>
+static int _view_parts(const T*) { return 1; };
+static int _view_parts(const Exiv2::URational*) { return 2; };
+static int _view_parts(const Exiv2::Rational*) { return 2; };
+template <typename T>
+static PyObject* value_type_view(PyObject* py_self, std::vector<T>& values) {
+    // PyMemoryView_FromBuffer needs a non-NULL pointer
+    static T empty;
+    T* ptr = values.empty() ? &empty : values.data();
+    int parts = _view_parts(ptr);
+    Py_ssize_t shape[2] = {(Py_ssize_t)values.size(), parts};
+    Py_ssize_t strides[2] = {(Py_ssize_t)sizeof(T),
+                             (Py_ssize_t)(sizeof(T) / parts)};
+    Py_buffer view;
+    view.buf = ptr;
+    view.obj = NULL;
+    view.len = values.size() * sizeof(T);
+    view.readonly = 0;
+    view.itemsize = sizeof(T) / parts;
+    view.format = (char*)_view_format(ptr);
+    view.ndim = parts == 1 ? 1 : 2;
+    view.shape = shape;
+    view.strides = strides;
+    view.suboffsets = NULL;
+    view.internal = NULL;
+    PyObject* result = PyMemoryView_FromBuffer(&view);
+    if (!result)
+        return NULL;
+    if (store_view(py_self, result)) {
+        Py_DECREF(result);
+        return NULL;
+    }
+    return result;
+};
+}
+
+// Function to set a ValueType's data from a Python buffer
+%fragment("value_from_buffer", "header", fragment="value_type_view") {
+%#include <cstring>
+
+// Check buffer has the same (native) format as the components
+static bool _buffer_matches(const Py_buffer* view, const char* format,
+                            Py_ssize_t itemsize) {
+    const char* unsigned_codes = "BHILQ";
+    const char* signed_codes = "bhilq";
+    const uint16_t one = 1;
+    const char native = *(const char*)&one ? '<' : '>';
+    const char* code = view->format ? view->format : "B";
+    if (*code == '@' || *code == '=' || *code == native)
+        code++;
+    if (!*code || code[1] || view->itemsize != itemsize)
+        return false;
+    if (*code == *format)
+        return true;
+    if (std::strchr(unsigned_codes, *code))
+        return std::strchr(unsigned_codes, *format) != NULL;
+    if (std::strchr(signed_codes, *code))
+        return std::strchr(signed_codes, *format) != NULL;
+    return false;
+};
+// Get a buffer view with the same format as values of type T, return false
+// if obj isn't a suitable buffer
+template <typename T>
+static bool _get_value_buffer(PyObject* obj, Py_buffer* view) {
+    if (!PyObject_CheckBuffer(obj))
+        return false;
+    if (PyObject_GetBuffer(obj, view, PyBUF_FORMAT | PyBUF_C_CONTIGUOUS)) {
+        PyErr_Clear();
+        return false;
+    }
+    const T* type_ptr = NULL;
+    Py_ssize_t itemsize = sizeof(T) / _view_parts(type_ptr);
+    if (_buffer_matches(view, _view_format(type_ptr), itemsize) &&
+            view->len % sizeof(T) == 0)
+        return true;
+    PyBuffer_Release(view);
+    return false;
+};
+template <typename T>
+static bool value_buffer_check(PyObject* obj) {
+    Py_buffer view;
+    if (!_get_value_buffer<T>(obj, &view))
+        return false;
+    PyBuffer_Release(&view);
+    return true;
+};
+// Copy buffer contents to values, return false if not a suitable buffer
+template <typename T>
+static bool value_from_buffer(std::vector<T>& values, PyObject* obj) {
+    Py_buffer view;
+    if (!_get_value_buffer<T>(obj, &view))
+        return false;
+    values.resize(view.len / sizeof(T));
+    if (view.len)
+        std::memcpy((void*)values.data(), view.buf, view.len);
+    PyBuffer_Release(&view);
+    return true;
+};
+}
+
+// Function to set a ValueType's data from a Python sequence
+%fragment("value_from_sequence", "header") {
+%#include <cfloat>
+%#include <cmath>
+%#include <limits>
+
+// Convert one Python number to a component. Anything with __index__ (or
+// __float__ for float components) is accepted, e.g. NumPy scalars.
+template <typename T>
+static bool _item_from_py(PyObject* obj, T& value) {
+    PyObject* index = PyNumber_Index(obj);
+    if (!index)
+        return false;
+    long long result = PyLong_AsLongLong(index);
+    Py_DECREF(index);
+    if (result == -1 && PyErr_Occurred())
+        return false;
+    if (result < (long long)std::numeric_limits<T>::min() ||
+            result > (long long)std::numeric_limits<T>::max()) {
+        PyErr_SetString(PyExc_OverflowError, "value out of range");
+        return false;
+    }
+    value = (T)result;
+    return true;
+};
+static bool _item_from_py(PyObject* obj, double& value) {
+    value = PyFloat_AsDouble(obj);
+    return !(value == -1.0 && PyErr_Occurred());
+};
+static bool _item_from_py(PyObject* obj, float& value) {
+    double result;
+    if (!_item_from_py(obj, result))
+        return false;
+    if (std::isfinite(result) && std::fabs(result) > FLT_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "value out of range");
+        return false;
+    }
+    value = (float)result;
+    return true;
+};
+template <typename T>
+static bool _item_from_py(PyObject* obj, std::pair<T, T>& value) {
+    PyObject* seq = PySequence_Fast(obj, "rational must be a pair of ints");
+    if (!seq)
+        return false;
+    bool result = PySequence_Fast_GET_SIZE(seq) == 2;
+    if (!result)
+        PyErr_SetString(PyExc_TypeError, "rational must be a pair of ints");
+    else
+        result = _item_from_py(PySequence_Fast_GET_ITEM(seq, 0),
+                               value.first) &&
+                 _item_from_py(PySequence_Fast_GET_ITEM(seq, 1),
+                               value.second);
+    Py_DECREF(seq);
+    return result;
+};
+// Convert a Python sequence to values, return false with a Python
+// exception set on failure
+template <typename T>
+static bool value_from_sequence(std::vector<T>& values, PyObject* obj) {
+    PyObject* seq = PySequence_Fast(obj, "value must be a sequence");
+    if (!seq)
+        return false;
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    std::vector<T> result(count);
+    for (Py_ssize_t i = 0; i < count; i++) {
+        if (!_item_from_py(PySequence_Fast_GET_ITEM(seq, i), result[i])) {
+            Py_DECREF(seq);
+            return false;
+        }
+    }
+    Py_DECREF(seq);
+    values.swap(result);
+    return true;
+};
+}
+
 // Macro for Exiv2::ValueType classes
 %define VALUETYPE(type_name, item_type, type_id)
 VALUE_SUBCLASS(Exiv2::ValueType<item_type>, type_name)
@@ -277,15 +469,54 @@ VALUE_SUBCLASS(Exiv2::ValueType<item_type>, type_name)
     std::pair< unsigned int,unsigned int > const &);
 // Access values as a list
 SQ_ITEM(Exiv2::ValueType<item_type>, item_type, self->value_[idx])
+%fragment("memoryview_funcs");
 SQ_ASS_ITEM(Exiv2::ValueType<item_type>, item_type,
             self->value_[idx] = value,
-            self->value_.erase(self->value_.begin() + idx))
+{
+    release_views(py_self);
+    self->value_.erase(self->value_.begin() + idx);
+})
 %feature("docstring") Exiv2::ValueType<item_type>
 "Sequence of " #item_type " values.\n"
 "The data components can be accessed like a Python list."
 %feature("docstring") Exiv2::ValueType<item_type>::append
 "Append a " #item_type " component to the value."
+%feature("docstring") Exiv2::ValueType<item_type>::data
+"Returns a temporary Python memoryview of the value's components.
+
+The memoryview shares memory with the value, so it can be used to read
+or write many components without creating a Python object for each one.
+Rational values have a second dimension of size 2 for the numerator and
+denominator. The memoryview is released if the number of components is
+changed.
+
+:rtype: memoryview"
+%feature("docstring") Exiv2::ValueType<item_type>::set_from_buffer
+"Replace the value's components with the contents of a buffer.
+
+The buffer (e.g. an :obj:`array.array` or NumPy array) must be C
+contiguous and have the same item format as :meth:`data`, in native
+byte order. Its data is copied in one operation. The value's
+constructor also accepts such a buffer.
+
+:type buffer: :py:term:`bytes-like object`
+:param buffer: The new component values."
 %template() std::vector<item_type>;
+// Constructor can copy a buffer with matching format in one go. The
+// typecheck doesn't look at a sequence's items, that's done by the in
+// typemap when they're converted.
+%typemap(typecheck, precedence=SWIG_TYPECHECK_VECTOR,
+         fragment="value_from_buffer")
+        Exiv2::ValueType<item_type>::ValueList {
+    $1 = value_buffer_check<item_type>($input) ||
+         (PySequence_Check($input) && !PyUnicode_Check($input));
+}
+%typemap(in, fragment="value_from_buffer", fragment="value_from_sequence")
+        Exiv2::ValueType<item_type>::ValueList {
+    if (!value_from_buffer($1, $input) && !value_from_sequence($1, $input)) {
+        %argument_fail(SWIG_TypeError, "$type", $symname, $argnum);
+    }
+}
 %extend Exiv2::ValueType<item_type> {
     // Constructor, reads values from a Python list
     ValueType<item_type>(Exiv2::ValueType<item_type>::ValueList value) {
@@ -296,6 +527,33 @@ SQ_ASS_ITEM(Exiv2::ValueType<item_type>, item_type,
     void append(item_type value) {
         $self->value_.push_back(value);
     }
+    %fragment("value_type_view");
+    PyObject* data(PyObject* py_self) {
+        return value_type_view(py_self, $self->value_);
+    }
+    %fragment("value_from_buffer");
+    PyObject* set_from_buffer(PyObject* buffer) {
+        if (!value_from_buffer($self->value_, buffer)) {
+            const item_type* type_ptr = NULL;
+            return PyErr_Format(PyExc_TypeError,
+                "buffer must be C contiguous with format '%s'",
+                _view_format(type_ptr));
+        }
+        return SWIG_Py_Void();
+    }
+}
+DEFINE_VIEW_CALLBACK(Exiv2::ValueType<item_type>,)
+// Changing the number of components may move the data
+%{
+#define RELEASE_VIEWS_##type_name##_append
+#define RELEASE_VIEWS_##type_name##_read
+#define RELEASE_VIEWS_##type_name##_set_from_buffer
+%}
+%typemap(check, fragment="memoryview_funcs")
+        Exiv2::ValueType<item_type>* self {
+%#ifdef RELEASE_VIEWS_$symname
+    release_views(self);
+%#endif
 }
 %template(type_name) Exiv2::ValueType<item_type>;
 %enddef // VALUETYPE
@@ -15,7 +15,8 @@
 // You should have received a copy of the GNU General Public License
 // along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-%module(package="exiv2") xmp
+%module(package="exiv2", threads="1") xmp
+%nothread;
 
 #ifndef SWIGIMPORTED
 %constant char* __doc__ = "XMP metadatum, container and iterators.";
@@ -24,7 +25,10 @@
 #pragma SWIG nowarn=508 // Declaration of '__str__' shadows declaration accessible via operator->()
 
 %include "shared/preamble.i"
+%include "shared/buffers.i"
 %include "shared/containers.i"
+%include "shared/windows.i"
+%include "shared/xmp_lock.i"
 
 %include "stdint.i"
 %include "std_string.i"
@@ -52,6 +56,9 @@ if 'sphinx' in sys.modules:
 // Catch all C++ exceptions
 EXCEPTION()
 
+// Initialise XMP with a lock function before it can be used by any thread
+%fragment("xmp_lock_init");
+
 DATA_CONTAINER(XmpData, Xmpdatum, XmpKey,
     Exiv2::XmpProperties::propertyType(Exiv2::XmpKey(datum->key())))
 
@@ -66,4 +73,243 @@ DATA_CONTAINER(XmpData, Xmpdatum, XmpKey,
 %ignore Exiv2::XmpParser::decode;
 %ignore Exiv2::XmpParser::encode;
 
+// Convert XmpData to and from a packet without using an Image
+%thread Exiv2::XmpData::from_packet;
+%thread Exiv2::XmpData::to_packet;
+%newobject Exiv2::XmpData::from_packet;
+INPUT_BUFFER_RO(const char* packet, BUFLEN_T size)
+%fragment("xmp_packet", "header") {
+static void _check_xmp_parser(int result, const char* action) {
+    switch (result) {
+        case 0:
+            return;
+        case 1:
+            throw Exiv2::Error(Exiv2::ErrorCode::kerErrorMessage,
+                "XMP toolkit support not compiled in");
+        case 2:
+            throw Exiv2::Error(Exiv2::ErrorCode::kerErrorMessage,
+                "XMP toolkit initialization failed");
+        default:
+            throw Exiv2::Error(Exiv2::ErrorCode::kerErrorMessage, action);
+    }
+};
+static Exiv2::XmpData* xmp_from_packet(const std::string& packet) {
+    std::unique_ptr<Exiv2::XmpData> result(new Exiv2::XmpData());
+    _check_xmp_parser(Exiv2::XmpParser::decode(*result, packet),
+                      "Failed to decode XMP packet");
+    return result.release();
+};
+}
+%feature("docstring") Exiv2::XmpData::from_packet
+"Decode an XMP packet to a new XmpData.
+
+This calls libexiv2's XMP parser directly, with the GIL released, so
+there's no need to create an :py:class:`Image` to hold the packet.
+
+:type packet: str or :term:`bytes-like object`
+:param packet: The XMP packet, as UTF-8 encoded bytes or a str.
+:rtype: :py:class:`XmpData`"
+%feature("docstring") Exiv2::XmpData::to_packet
+"Encode the XMP data as a packet.
+
+The GIL is released while the packet is encoded.
+
+:type format_flags: int, optional
+:param format_flags: Serialisation options, a combination of
+    XmpParser format flags such as ``XmpParser.omitPacketWrapper``.
+    Defaults to ``XmpParser.useCompactFormat``.
+:type padding: int, optional
+:param padding: Number of padding bytes to add to the packet.
+:rtype: str"
+%extend Exiv2::XmpData {
+    %fragment("xmp_packet");
+    static Exiv2::XmpData* from_packet(const std::string& packet) {
+        return xmp_from_packet(packet);
+    }
+    static Exiv2::XmpData* from_packet(const char* packet, BUFLEN_T size) {
+        return xmp_from_packet(std::string(packet, size));
+    }
+    std::string to_packet(
+            uint16_t format_flags = Exiv2::XmpParser::useCompactFormat,
+            uint32_t padding = 0) {
+        std::string result;
+        _check_xmp_parser(
+            Exiv2::XmpParser::encode(result, *self, format_flags, padding),
+            "Failed to encode XMP packet");
+        return result;
+    }
+}
+
 %include "exiv2/xmp_exiv2.hpp"
+
+// Read and write XMP sidecar files without using an Image
+%thread read_sidecar;
+%thread write_sidecar;
+%newobject read_sidecar;
+EXV_ENABLE_FILESYSTEM_FUNCTION(read_sidecar)
+EXV_ENABLE_FILESYSTEM_FUNCTION(write_sidecar)
+EXV_ENABLE_FILESYSTEM_FUNCTION(read_sidecars)
+WINDOWS_PATH(const std::string& path)
+%fragment("xmp_sidecar", "header", fragment="xmp_packet",
+          fragment="_set_python_exception", fragment="py_to_path",
+          fragment="replace_file") {
+%#include <cstdio>
+%#include <exception>
+%#include <fstream>
+%#include <iterator>
+%#include <vector>
+
+static Exiv2::XmpData* xmp_read_sidecar(const std::string& path) {
+    std::ifstream file(path.c_str(), std::ios::in | std::ios::binary);
+    if (!file)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerDataSourceOpenFailed,
+                           path, Exiv2::strError());
+    std::string packet((std::istreambuf_iterator<char>(file)),
+                       std::istreambuf_iterator<char>());
+    if (file.bad())
+        throw Exiv2::Error(Exiv2::ErrorCode::kerFailedToReadImageData);
+    return xmp_from_packet(packet);
+};
+static void xmp_write_sidecar(const std::string& path,
+                              const Exiv2::XmpData& data) {
+    // Use the same format as libexiv2's XmpSidecar image
+    std::string packet;
+    _check_xmp_parser(Exiv2::XmpParser::encode(
+        packet, data, Exiv2::XmpParser::omitPacketWrapper |
+                      Exiv2::XmpParser::useCompactFormat),
+        "Failed to encode XMP packet");
+    if (!packet.empty() && packet.compare(0, 5, "<?xml") != 0)
+        packet = "<?xpacket begin=\"\xef\xbb\xbf\" "
+                 "id=\"W5M0MpCehiHzreSzNTczkc9d\"?>\n" + packet +
+                 "<?xpacket end=\"w\"?>";
+    // Write to a temporary file so a failure leaves any existing file intact
+    std::string tmp_path = path + ".exiv2-tmp";
+    std::ofstream file(tmp_path.c_str(), std::ios::out | std::ios::binary |
+                                         std::ios::trunc);
+    if (!file)
+        throw Exiv2::Error(Exiv2::ErrorCode::kerFileOpenFailed,
+                           tmp_path, "wb", Exiv2::strError());
+    file.write(packet.data(), packet.size());
+    file.close();
+    if (file.fail()) {
+        std::remove(tmp_path.c_str());
+        throw Exiv2::Error(Exiv2::ErrorCode::kerImageWriteFailed);
+    }
+    replace_file(tmp_path, path);
+};
+// Get the current Python exception as an object
+static PyObject* _fetch_exception() {
+    PyObject *type, *value, *traceback;
+    PyErr_Fetch(&type, &value, &traceback);
+    if (!type) {
+        PyErr_SetString(PyExc_SystemError,
+                        "error return without exception set");
+        return NULL;
+    }
+    PyErr_NormalizeException(&type, &value, &traceback);
+    Py_XDECREF(type);
+    Py_XDECREF(traceback);
+    return value;
+};
+static PyObject* xmp_read_sidecars(PyObject* py_paths) {
+    PyObject* seq = PySequence_Fast(py_paths, "paths must be iterable");
+    if (!seq)
+        return NULL;
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    std::vector<std::string> paths;
+    paths.reserve(count);
+    for (Py_ssize_t i = 0; i < count; i++) {
+        std::string path;
+        if (py_to_path(PySequence_Fast_GET_ITEM(seq, i), &path)) {
+            Py_DECREF(seq);
+            return NULL;
+        }
+        paths.push_back(path);
+    }
+    Py_DECREF(seq);
+    std::vector<Exiv2::XmpData*> data(count, NULL);
+    std::vector<std::exception_ptr> errors(count);
+    SWIG_PYTHON_THREAD_BEGIN_ALLOW;
+    for (Py_ssize_t i = 0; i < count; i++) {
+        try {
+            data[i] = xmp_read_sidecar(paths[i]);
+        }
+        catch(...) {
+            errors[i] = std::current_exception();
+        }
+    }
+    SWIG_PYTHON_THREAD_END_ALLOW;
+    PyObject* result = PyList_New(count);
+    for (Py_ssize_t i = 0; i < count; i++) {
+        PyObject* item = NULL;
+        if (result && errors[i]) {
+            try {
+                std::rethrow_exception(errors[i]);
+            }
+            catch(std::exception const&) {
+                _set_python_exception();
+            }
+            catch(...) {
+                PyErr_SetString(PyExc_RuntimeError, "unknown exception");
+            }
+            item = _fetch_exception();
+        }
+        else if (result) {
+            item = SWIG_NewPointerObj(data[i], $descriptor(Exiv2::XmpData*),
+                                      SWIG_POINTER_OWN);
+            data[i] = NULL;
+        }
+        if (!item) {
+            Py_CLEAR(result);
+            delete data[i];
+            continue;
+        }
+        PyList_SET_ITEM(result, i, item);
+    }
+    return result;
+};
+}
+%fragment("xmp_sidecar");
+
+%feature("docstring") read_sidecar "Read an XMP sidecar file.
+
+The file is read straight into libexiv2's XMP parser, with the GIL
+released, without the file type detection and :py:class:`Image` object
+used by :py:meth:`ImageFactory.open`.
+
+:type path: str
+:param path: The sidecar file path.
+:rtype: :py:class:`XmpData`"
+%feature("docstring") write_sidecar "Write an XMP sidecar file.
+
+The data is written in the same format as libexiv2's XmpSidecar image,
+with the GIL released. The data is written to a temporary file which
+then replaces any existing file, so a failed write leaves the existing
+file unchanged.
+
+:type path: str
+:param path: The sidecar file path.
+:type xmpData: :py:class:`XmpData`
+:param xmpData: The XMP data to write."
+%feature("docstring") read_sidecars "Read many XMP sidecar files.
+
+The files are read one after another without holding the GIL. The
+result is a list with an item for each path, in the same order. Each
+item is an :py:class:`XmpData` on success or an :class:`Exiv2Error`
+exception object on failure.
+
+:type paths: iterable of str, bytes or path-like objects
+:param paths: The sidecar file paths.
+:rtype: list"
+%inline %{
+static Exiv2::XmpData* read_sidecar(const std::string& path) {
+    return xmp_read_sidecar(path);
+};
+static void write_sidecar(const std::string& path,
+                          const Exiv2::XmpData& xmpData) {
+    xmp_write_sidecar(path, xmpData);
+};
+static PyObject* read_sidecars(PyObject* paths) {
+    return xmp_read_sidecars(paths);
+};
+%}
@@ -18,15 +18,139 @@
 import argparse
 import os
 import pprint
+import statistics
+import subprocess
 import sys
+import tempfile
 
 import exiv2
 
+# Script run in a new interpreter to time each cold start phase
+_bench_script = """
+import sys
+import time
+paths, use_file = sys.argv[1:3], sys.argv[3] == '1'
+if not use_file:
+    for i, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            paths[i] = f.read()
+times = [time.perf_counter()]
+import exiv2
+times.append(time.perf_counter())
+images = [exiv2.ImageFactory.open(path) for path in paths]
+times.append(time.perf_counter())
+# the first image has no XMP, so libexiv2 doesn't parse any
+images[0].readMetadata()
+times.append(time.perf_counter())
+# libexiv2 initialises its XMP toolkit and parses the XMP packet here
+images[1].readMetadata()
+times.append(time.perf_counter())
+for datum in images[1].xmpData():
+    datum.toString()
+times.append(time.perf_counter())
+durations = [b - a for (a, b) in zip(times, times[1:])]
+# import modules before timing the doc strings
+enums = [eval('exiv2.' + name) for name in {enums}]
+start = time.perf_counter()
+for enum in enums:
+    for member in enum:
+        member.__doc__
+durations.append(time.perf_counter() - start)
+print(*durations)
+"""
+
+_bench_phases = ('import exiv2', 'open 2 images', 'read without XMP',
+                 'read with XMP', 'iterate xmpData()', 'enum doc strings')
+
+# Enums whose members' doc strings are read in the last phase
+_bench_enums = ('ErrorCode', 'LogMsg.Level', 'ImageType', 'XmpCategory',
+                'IfdId', 'SectionId', 'AccessMode', 'ByteOrder', 'MetadataId',
+                'TypeId', 'CommentValue.CharsetId', 'XmpValue.XmpArrayType',
+                'XmpValue.XmpStruct')
+
+
+def bench_startup(path, repeats):
+    """Time ``import exiv2``, the first use of an image, and reading
+    every enum member's doc string in new interpreters, and the import
+    time of each python-exiv2 module.
+
+    A copy of the image without XMP is read first, then the image
+    itself, so the cost of libexiv2's XMP parsing (including its one
+    off initialisation) is shown separately from reading other metadata.
+    The image should have some XMP for this to be useful. If libexiv2
+    can't write XMP to the image's format the image is read twice.
+
+    The interpreters are run with ``-X importtime``, which adds a little
+    to every phase's time.
+    """
+    use_file = exiv2.versionInfo()['EXV_ENABLE_FILESYSTEM']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not path:
+            # make an image with some XMP
+            path = os.path.join(tmp_dir, 'image.jpg')
+            image = exiv2.ImageFactory.create(exiv2.ImageType.jpeg)
+            image.xmpData()['Xmp.dc.description'] = 'python-exiv2 benchmark'
+            image.writeMetadata()
+            with open(path, 'wb') as f:
+                f.write(image.data())
+        # make a copy without XMP, if libexiv2 can write the format
+        with open(path, 'rb') as f:
+            image = exiv2.ImageFactory.open(f.read())
+        mode = exiv2.ImageFactory.checkMode(
+            image.imageType(), exiv2.MetadataId.Xmp)
+        if mode & exiv2.AccessMode.Write:
+            image.readMetadata()
+            image.clearXmpData()
+            image.writeMetadata()
+            no_xmp_path = os.path.join(
+                tmp_dir, 'no_xmp' + os.path.splitext(path)[1])
+            with open(no_xmp_path, 'wb') as f:
+                f.write(image.data())
+        else:
+            print('cannot write XMP to {}, reading it twice'.format(path))
+            no_xmp_path = path
+        del image
+        phases = []
+        modules = {}
+        for i in range(repeats):
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c',
+                 _bench_script.format(enums=repr(_bench_enums)),
+                 no_xmp_path, path, str(int(use_file))],
+                check=True, capture_output=True, text=True)
+            phases.append([float(x) for x in result.stdout.split()])
+            # -X importtime output is "self | cumulative | name" in us
+            for line in result.stderr.splitlines():
+                if not line.startswith('import time:'):
+                    continue
+                self_us, cumulative, name = line[12:].split('|')
+                name = name.strip()
+                if name.split('.')[0] == 'exiv2':
+                    modules.setdefault(name, []).append(int(self_us))
+    print('cold start times (median of {} runs):'.format(repeats))
+    for name, times in zip(_bench_phases, zip(*phases)):
+        print('{:>20s}{:>10.2f}ms'.format(
+            name, statistics.median(times) * 1.0e3))
+    print('module import times (median of {} runs):'.format(repeats))
+    for name, times in sorted(modules.items(),
+                              key=lambda x: -statistics.median(x[1])):
+        print('{:>20s}{:>10.2f}ms'.format(
+            name, statistics.median(times) * 1.0e-3))
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-v', '--verbosity', help='increase output verbosity',
                         action='store_true')
+    parser.add_argument('--bench-startup', nargs='?', const='',
+                        metavar='IMAGE',
+                        help='time import and first use of an image file')
+    parser.add_argument('--repeats', type=int, default=10,
+                        help='number of runs of each benchmark')
     args = parser.parse_args()
+    if args.bench_startup is not None:
+        return bench_startup(args.bench_startup, args.repeats)
     print('libexiv2 version:', exiv2.version())
     print('python-exiv2 version:', exiv2.__version__)
     print('python-exiv2 examples:',
@@ -1,4 +1,5 @@
 
+import importlib
 import os
 import sys
 
@@ -15,37 +16,169 @@ __version__ = "0.18.1"
 __version_tuple__ = tuple((0, 18, 1))
 
 from exiv2.extras import Exiv2Error
-__all__ = ["Exiv2Error"]
-from exiv2.basicio import *
-__all__ += exiv2._basicio.__all__
-from exiv2.datasets import *
-__all__ += exiv2._datasets.__all__
-from exiv2.easyaccess import *
-__all__ += exiv2._easyaccess.__all__
-from exiv2.error import *
-__all__ += exiv2._error.__all__
-from exiv2.exif import *
-__all__ += exiv2._exif.__all__
-from exiv2.image import *
-__all__ += exiv2._image.__all__
-from exiv2.iptc import *
-__all__ += exiv2._iptc.__all__
-from exiv2.metadatum import *
-__all__ += exiv2._metadatum.__all__
-from exiv2.preview import *
-__all__ += exiv2._preview.__all__
-from exiv2.properties import *
-__all__ += exiv2._properties.__all__
-from exiv2.tags import *
-__all__ += exiv2._tags.__all__
-from exiv2.types import *
-__all__ += exiv2._types.__all__
-from exiv2.value import *
-__all__ += exiv2._value.__all__
-from exiv2.version_module import *
-__all__ += exiv2._version_module.__all__
-from exiv2.xmp import *
-__all__ += exiv2._xmp.__all__
-
-__all__ = [x for x in __all__ if x[0] != '_']
-__all__.sort()
+# The error module sends libexiv2 log messages to Python's logging
+import exiv2.error
+
+# Extension modules are imported when one of their names is first used
+_modules = ('basicio',
+ 'datasets',
+ 'easyaccess',
+ 'error',
+ 'exif',
+ 'image',
+ 'iptc',
+ 'metadatum',
+ 'preview',
+ 'properties',
+ 'tags',
+ 'types',
+ 'value',
+ 'version_module',
+ 'xmp')
+_names = {'basicio': ('BasicIo', 'Position'),
+ 'datasets': ('DataSet', 'IptcDataSets', 'IptcKey'),
+ 'easyaccess': ('afPoint',
+                'apertureValue',
+                'brightnessValue',
+                'contrast',
+                'dateTimeOriginal',
+                'exposureBiasValue',
+                'exposureIndex',
+                'exposureMode',
+                'exposureTime',
+                'fNumber',
+                'flash',
+                'flashBias',
+                'flashEnergy',
+                'focalLength',
+                'imageQuality',
+                'isoSpeed',
+                'lensName',
+                'lightSource',
+                'macroMode',
+                'make',
+                'maxApertureValue',
+                'meteringMode',
+                'model',
+                'orientation',
+                'saturation',
+                'sceneCaptureType',
+                'sceneMode',
+                'sensingMethod',
+                'serialNumber',
+                'sharpness',
+                'shutterSpeedValue',
+                'subjectArea',
+                'subjectDistance',
+                'whiteBalance'),
+ 'error': ('ErrorCode', 'LogMsg', 'LogMsg_defaultHandler_get', 'cvar'),
+ 'exif': ('ExifData',
+          'ExifData_iterator',
+          'ExifThumb',
+          'ExifThumbC',
+          'Exifdatum',
+          'Exifdatum_pointer',
+          'Exifdatum_reference'),
+ 'image': ('Image', 'ImageFactory', 'ImageType', 'enableBMFF'),
+ 'iptc': ('IptcData',
+          'IptcData_iterator',
+          'Iptcdatum',
+          'Iptcdatum_pointer',
+          'Iptcdatum_reference'),
+ 'metadatum': ('Key', 'Metadatum', 'MetadatumPointerBase'),
+ 'preview': ('PreviewImage', 'PreviewManager', 'PreviewProperties'),
+ 'properties': ('XmpCategory',
+                'XmpKey',
+                'XmpNsInfo',
+                'XmpProperties',
+                'XmpPropertyInfo'),
+ 'tags': ('ExifKey',
+          'ExifTags',
+          'GroupInfo',
+          'IfdId',
+          'SectionId',
+          'TagInfo'),
+ 'types': ('AccessMode',
+           'ByteOrder',
+           'DataBuf',
+           'MetadataId',
+           'Rational',
+           'TypeId',
+           'TypeInfo',
+           'URational',
+           'exvGettext'),
+ 'value': ('AsciiValue',
+           'CharsetId',
+           'CommentValue',
+           'DataValue',
+           'Date',
+           'DateValue',
+           'DoubleValue',
+           'FloatValue',
+           'LangAltValue',
+           'LongValue',
+           'RationalValue',
+           'ShortValue',
+           'StringValue',
+           'StringValueBase',
+           'Time',
+           'TimeValue',
+           'ULongValue',
+           'URationalValue',
+           'UShortValue',
+           'Value',
+           'XmpArrayType',
+           'XmpArrayValue',
+           'XmpStruct',
+           'XmpTextValue',
+           'XmpValue'),
+ 'version_module': ('testVersion',
+                    'version',
+                    'versionInfo',
+                    'versionNumber',
+                    'versionNumberHexString',
+                    'versionString'),
+ 'xmp': ('XmpData',
+         'XmpData_iterator',
+         'XmpParser',
+         'Xmpdatum',
+         'Xmpdatum_pointer',
+         'Xmpdatum_reference')}
+_module_of = dict((name, module) for module in _modules
+                  for name in _names[module])
+
+
+def __getattr__(name):
+    global __all__
+    if name == '__all__':
+        __all__ = ['Exiv2Error']
+        for module in _modules:
+            importlib.import_module('exiv2.' + module)
+            __all__ += sys.modules['exiv2._' + module].__all__
+        __all__ = [x for x in __all__ if x[0] != '_']
+        __all__.sort()
+        return __all__
+    if name in _modules:
+        return importlib.import_module('exiv2.' + name)
+    if name.startswith('_'):
+        # Don't import every module looking for private or dunder names
+        raise AttributeError(f"module 'exiv2' has no attribute '{name}'")
+    # Search every module for names not in the table
+    for module in (_module_of[name],) if name in _module_of else _modules:
+        module = importlib.import_module('exiv2.' + module)
+        if name in module.__dict__:
+            if name in getattr(module, '__all__', (name,)):
+                result = module.__dict__[name]
+                globals()[name] = result
+                return result
+        elif '__getattr__' in module.__dict__:
+            # Deprecated names are not cached, so they always warn
+            try:
+                return module.__getattr__(name)
+            except AttributeError:
+                pass
+    raise AttributeError(f"module 'exiv2' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules) | set(_module_of))
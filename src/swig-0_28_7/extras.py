@@ -24,10 +24,9 @@ __all__ = ['Exiv2Error']
 
 import enum
 import logging
+import sys
 import warnings
 
-from exiv2._enum_data import enum_data
-
 
 class Exiv2Error(Exception):
     """Python exception raised by exiv2 library errors.
@@ -43,23 +42,54 @@ class Exiv2Error(Exception):
 logger = logging.getLogger('exiv2')
 
 
-class DeprecatedEnumMeta(enum.EnumMeta):
-    def __getattribute__(cls, name):
-        obj = super().__getattribute__(name)
-        if isinstance(obj, enum.IntEnum):
-            warnings.warn(cls._msg, DeprecationWarning, 2)
-        return obj
-
-
-class DeprecatedEnum(enum.IntEnum, metaclass=DeprecatedEnumMeta):
-    pass
+def _deprecated_enum(module_globals, moved_to, name):
+    """Add a deprecated alias of an enum to a module.
 
-
-def _deprecated_enum(moved_to, new_enum):
-    name = new_enum.__name__
-    result = DeprecatedEnum(name, new_enum.__members__)
-    result._msg = f"Use '{moved_to}.{name}' instead of '{name}'"
-    return result
+    The alias isn't a module attribute, so it's found by the module's
+    ``__getattr__`` function. This returns the enum itself, so using its
+    members has no extra cost.
+    """
+    aliases = module_globals.setdefault('_deprecated_enums', {})
+    aliases[name] = (f"Use '{moved_to}.{name}' instead of '{name}'",
+                     getattr(module_globals[moved_to], name))
+    if '__getattr__' in module_globals:
+        return
+    module_name = module_globals['__name__']
+
+    def __getattr__(name):
+        if name not in aliases:
+            raise AttributeError(
+                f"module '{module_name}' has no attribute '{name}'")
+        msg, result = aliases[name]
+        # warn the first caller outside the exiv2 package
+        stacklevel = 2
+        frame = sys._getframe(1)
+        while frame and frame.f_globals.get(
+                '__name__', '').split('.')[0] == 'exiv2':
+            frame = frame.f_back
+            stacklevel += 1
+        warnings.warn(msg, DeprecationWarning, stacklevel)
+        return result
+
+    module_globals['__getattr__'] = __getattr__
+
+
+class _EnumDoc(object):
+    """Enum and enum member doc strings, read from :py:mod:`_enum_data`
+    when first used instead of when the enum is created."""
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+
+    def __get__(self, obj, objtype=None):
+        from exiv2._enum_data import enum_data
+        data = enum_data[self.name]
+        if obj is None:
+            return data['doc'] or self.default
+        return data['values'].get(obj.name) or self.__get__(None)
+
+    def __set__(self, obj, value):
+        raise AttributeError('enum member doc strings are read-only')
 
 
 def _create_enum(module, name, alias_strip, members):
@@ -68,10 +98,6 @@ def _create_enum(module, name, alias_strip, members):
         members += [(k[alias_strip:], v) for (k, v) in members]
     result = enum.IntEnum(name.split('::')[-1], members)
     result.__module__ = 'exiv2.' + module[1:]
-    data = enum_data[name]
-    if data['doc']:
-        result.__doc__ = data['doc']
-    for key, value in data['values'].items():
-        result[key].__doc__ = value
+    result.__doc__ = _EnumDoc(name, result.__doc__)
     return result
 
@@ -27,16 +27,16 @@ if 'sphinx' in sys.modules:
 
 from exiv2.extras import _deprecated_enum
 
-CharsetId = _deprecated_enum("CommentValue", CommentValue.CharsetId)
+_deprecated_enum(globals(), "CommentValue", "CharsetId")
 
 
 from exiv2.extras import _deprecated_enum
 
-XmpArrayType = _deprecated_enum("XmpValue", XmpValue.XmpArrayType)
+_deprecated_enum(globals(), "XmpValue", "XmpArrayType")
 
 
 from exiv2.extras import _deprecated_enum
 
-XmpStruct = _deprecated_enum("XmpValue", XmpValue.XmpStruct)
+_deprecated_enum(globals(), "XmpValue", "XmpStruct")
 
 
@@ -16,6 +16,6 @@ else:
 
 from exiv2.extras import _deprecated_enum
 
-Position = _deprecated_enum("BasicIo", BasicIo.Position)
+_deprecated_enum(globals(), "BasicIo", "Position")
 
 
@@ -0,0 +1,97 @@
+##  python-exiv2 - Python interface to libexiv2
+##  http://github.com/jim-easterbrook/python-exiv2
+##  Copyright (C) 2026  Jim Easterbrook  jim@jim-easterbrook.me.uk
+##
+##  This program is free software: you can redistribute it and/or
+##  modify it under the terms of the GNU General Public License as
+##  published by the Free Software Foundation, either version 3 of the
+##  License, or (at your option) any later version.
+##
+##  This program is distributed in the hope that it will be useful,
+##  but WITHOUT ANY WARRANTY; without even the implied warranty of
+##  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##  GNU General Public License for more details.
+##
+##  You should have received a copy of the GNU General Public License
+##  along with this program.  If not, see
+##  <http://www.gnu.org/licenses/>.
+
+"""Check that metadata container operations scale linearly.
+
+This is not part of the test suite, as timings are too variable on
+shared machines. Run it with ``python tests/bench_pointers.py``. Each
+line shows the time per datum for a container of the given size. With
+linear scaling the times should be roughly constant as the size grows.
+"""
+
+import sys
+import time
+
+import exiv2
+
+
+def make_data(size):
+    data = exiv2.ExifData()
+    value = exiv2.AsciiValue('x')
+    for tag in range(size):
+        data.add(exiv2.ExifKey(tag, 'Image'), value)
+    return data
+
+
+def iterate(data, keys):
+    for datum in data:
+        datum.key()
+
+
+def iterate_keep(data, keys):
+    # keep an iterator alive for each datum
+    iterators = [data.begin() for datum in data]
+
+
+def lookup(data, keys):
+    for key in keys:
+        data[key]
+
+
+def lookup_missing(data, keys):
+    # keys that aren't in data, not all in canonical form
+    for idx in range(len(keys)):
+        'Exif.Image2.0x{:04x}'.format(idx) in data
+
+
+def delete(data, keys):
+    for key in keys:
+        del data[key]
+
+
+def lookup_keep(data, keys):
+    # keep a reference to each datum alive
+    references = [data[key] for key in keys]
+
+
+def clear_keep(data, keys):
+    references = [data[key] for key in keys]
+    data.clear()
+    references = None
+
+
+def main():
+    sizes = (1250, 2500, 5000, 10000)
+    print('{:>14s}'.format('size') + ''.join(
+        '{:>10d}'.format(size) for size in sizes))
+    for func in (iterate, iterate_keep, lookup, lookup_missing, delete,
+                 lookup_keep, clear_keep):
+        times = []
+        for size in sizes:
+            data = make_data(size)
+            keys = [datum.key() for datum in data]
+            start = time.perf_counter()
+            func(data, keys)
+            times.append((time.perf_counter() - start) / size)
+        print('{:>14s}'.format(func.__name__) + ''.join(
+            '{:>8.2f}us'.format(t * 1.0e6) for t in times))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
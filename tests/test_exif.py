@@ -16,6 +16,7 @@
 ##  along with this program.  If not, see
 ##  <http://www.gnu.org/licenses/>.
 
+import fractions
 import io
 import os
 import sys
@@ -151,6 +152,44 @@ class TestExifModule(unittest.TestCase):
         self.assertEqual(len(data), 0)
         self.assertEqual(data.empty(), True)
 
+    def test_key_lookup(self):
+        self.image.readMetadata()
+        data = self.image.exifData()
+        keys = [datum.key() for datum in data]
+        for key in keys:
+            self.assertEqual(key in data, True)
+            self.assertEqual(data[key].key(), key)
+        self.assertEqual('Exif.Image.Make' in data, False)
+        # changes made via the container
+        del data[keys[0]]
+        self.assertEqual(keys[0] in data, False)
+        self.assertEqual(data[keys[1]].key(), keys[1])
+        data['Exif.Image.Make'] = 'Acme'
+        self.assertEqual(data['Exif.Image.Make'].toString(), 'Acme')
+        data.add(exiv2.ExifKey('Exif.Image.Model'), exiv2.AsciiValue('Camera'))
+        self.assertEqual(data['Exif.Image.Model'].toString(), 'Camera')
+        data.sortByKey()
+        for key in keys[1:]:
+            self.assertEqual(data[key].key(), key)
+        # changes made without the container knowing
+        self.image.readMetadata()
+        self.assertEqual('Exif.Image.Make' in data, False)
+        for key in keys:
+            self.assertEqual(data[key].key(), key)
+        data.clear()
+        self.assertEqual(keys[1] in data, False)
+        # two Python objects wrapping the image's data
+        self.image.readMetadata()
+        data = self.image.exifData()
+        data2 = self.image.exifData()
+        self.assertEqual(data2[keys[0]].key(), keys[0])
+        del data[keys[0]]
+        self.assertEqual(keys[0] in data2, False)
+        self.assertEqual(data2[keys[1]].key(), keys[1])
+        # key not in canonical form
+        self.assertEqual(data['Exif.Image.0x0132'].key(),
+                         'Exif.Image.DateTime')
+
     def _test_datum(self, datum):
         self.assertIsInstance(str(datum), str)
         self.assertEqual(str(datum.__deref__()), 'Exif.Image.ImageDescription:'
@@ -190,7 +229,7 @@ class TestExifModule(unittest.TestCase):
         self.assertEqual(datum.toRational(0), (71, 1))
         self.assertEqual(datum.toString(), 'Good view of the lighthouse.')
         self.assertEqual(datum.toString(0), 'Good view of the lighthouse.')
-        self.assertEqual(datum.typeId(), exiv2.TypeId.asciiString)
+        self.assertIs(datum.typeId(), exiv2.TypeId.asciiString)
         self.assertEqual(datum.typeName(), 'Ascii')
         self.assertEqual(datum.typeSize(), 1)
         self.assertIsInstance(datum.value(), exiv2.AsciiValue)
@@ -276,6 +315,99 @@ class TestExifModule(unittest.TestCase):
                 with self.assertRaises(exiv2.Exiv2Error):
                     thumb.setJpegThumbnail(temp_file)
 
+    def test_records(self):
+        self.image.readMetadata()
+        data = self.image.exifData()
+        records = data.records()
+        self.assertIsInstance(records, list)
+        self.assertEqual(len(records), len(data))
+        for record, datum in zip(records, data):
+            self.assertIsInstance(record, tuple)
+            self.assertIsInstance(record, exiv2.Exifdatum_record)
+            key, type_id, count, raw = record
+            self.assertEqual(key, datum.key())
+            self.assertEqual(record.key, datum.key())
+            self.assertEqual(type_id, datum.typeId())
+            self.assertIsInstance(record.typeId, exiv2.TypeId)
+            self.assertEqual(count, datum.count())
+            self.assertIsInstance(raw, bytes)
+            self.assertEqual(len(raw), datum.size())
+            buf = bytearray(datum.size())
+            datum.value().copy(buf, exiv2.ByteOrder.littleEndian)
+            self.assertEqual(raw, buf)
+        records = data.records(exiv2.ByteOrder.bigEndian)
+        for record, datum in zip(records, data):
+            buf = bytearray(datum.size())
+            datum.value().copy(buf, exiv2.ByteOrder.bigEndian)
+            self.assertEqual(record.data, buf)
+        # records don't refer to the container
+        data.clear()
+        self.assertEqual(records[0].key, 'Exif.Image.ProcessingSoftware')
+        self.assertEqual(data.records(), [])
+
+    def test_to_bytes(self):
+        self.image.readMetadata()
+        data = self.image.exifData()
+        blob = data.to_bytes()
+        self.assertIsInstance(blob, bytes)
+        self.assertEqual(blob[:4], b'II*\x00')
+        copy = exiv2.ExifData.from_bytes(blob)
+        self.assertIsInstance(copy, exiv2.ExifData)
+        self.assertEqual(copy['Exif.Image.ProcessingSoftware'].toString(),
+                         data['Exif.Image.ProcessingSoftware'].toString())
+        blob = data.to_bytes(exiv2.ByteOrder.bigEndian)
+        self.assertEqual(blob[:4], b'MM\x00*')
+        copy = exiv2.ExifData.from_bytes(memoryview(blob))
+        self.assertEqual(copy['Exif.Image.ProcessingSoftware'].toString(),
+                         data['Exif.Image.ProcessingSoftware'].toString())
+        with self.assertRaises(TypeError):
+            exiv2.ExifData.from_bytes('not a buffer')
+        with self.assertRaises(exiv2.Exiv2Error):
+            exiv2.ExifData.from_bytes(b'not a TIFF blob')
+
+    def test_to_dict(self):
+        self.image.readMetadata()
+        data = self.image.exifData()
+        result = data.to_dict()
+        self.assertIsInstance(result, dict)
+        self.assertEqual(list(result), [datum.key() for datum in data])
+        self.assertEqual(result['Exif.Image.ImageDescription'],
+                         'Good view of the lighthouse.')
+        for datum in data:
+            value = result[datum.key()]
+            type_id = datum.typeId()
+            if datum.count() > 1 and type_id not in (
+                    exiv2.TypeId.asciiString, exiv2.TypeId.undefined):
+                self.assertIsInstance(value, list)
+            elif type_id in (exiv2.TypeId.unsignedShort,
+                             exiv2.TypeId.unsignedLong):
+                self.assertIsInstance(value, int)
+                self.assertEqual(value, datum.toFloat(0))
+            elif type_id in (exiv2.TypeId.unsignedRational,
+                             exiv2.TypeId.signedRational):
+                self.assertIsInstance(value, fractions.Fraction)
+                self.assertEqual(
+                    (value.numerator, value.denominator),
+                    datum.toRational(0))
+            elif type_id == exiv2.TypeId.asciiString:
+                self.assertEqual(value, datum.toString())
+            elif type_id == exiv2.TypeId.undefined:
+                self.assertIsInstance(value, bytes)
+                self.assertEqual(len(value), datum.size())
+        result = data.to_dict('string')
+        for datum in data:
+            self.assertEqual(result[datum.key()], datum.toString())
+        result = data.to_dict('print')
+        for datum in data:
+            self.assertEqual(result[datum.key()], datum.print(data))
+        with self.assertRaises(ValueError):
+            data.to_dict('fred')
+        self.assertEqual(exiv2.ExifData().to_dict(), {})
+        # rational with zero denominator
+        data = exiv2.ExifData()
+        data['Exif.Photo.FNumber'] = exiv2.URationalValue([(4, 0)])
+        self.assertEqual(data.to_dict(), {'Exif.Photo.FNumber': (4, 0)})
+
     def test_pointers(self):
         data = exiv2.ExifData()
         data.add(exiv2.Exifdatum(
@@ -16,7 +16,10 @@
 ##  along with this program.  If not, see
 ##  <http://www.gnu.org/licenses/>.
 
+import io
 import os
+import pathlib
+import shutil
 import sys
 import tempfile
 import unittest
@@ -154,6 +157,193 @@ class TestImageModule(unittest.TestCase):
         image.setComment('fred')
         self.check_result(image.comment(), str, 'fred')
 
+    def test_lazy_xmp(self):
+        image = exiv2.ImageFactory.open(self.image_data)
+        image.setLazyXmp(True)
+        image.readMetadata()
+        packet = image.xmpPacket()
+        # packet is reused if XMP data hasn't been used
+        image.exifData()['Exif.Image.Orientation'] = 6
+        image.writeMetadata()
+        image.readMetadata()
+        self.assertEqual(image.xmpPacket(), packet)
+        self.assertEqual(image.exifData()['Exif.Image.Orientation'].toLong(),
+                         6)
+        # using XMP data stops packet being reused
+        image.xmpData()['Xmp.dc.format'] = 'image/png'
+        image.writeMetadata()
+        image.readMetadata()
+        self.assertNotEqual(image.xmpPacket(), packet)
+        self.assertEqual(str(image.xmpData()['Xmp.dc.format'].value()),
+                         'image/png')
+        # XmpData reference from before readMetadata
+        xmp_data = image.xmpData()
+        image.readMetadata()
+        xmp_data['Xmp.dc.format'] = 'image/gif'
+        image.writeMetadata()
+        del xmp_data
+        image = exiv2.ImageFactory.open(bytes(image.data()))
+        image.readMetadata()
+        self.assertEqual(str(image.xmpData()['Xmp.dc.format'].value()),
+                         'image/gif')
+        # enabling lazy mode takes effect on next read
+        xmp_data = image.xmpData()
+        image.setLazyXmp(True)
+        xmp_data['Xmp.dc.format'] = 'image/png'
+        image.writeMetadata()
+        del xmp_data
+        image.readMetadata()
+        self.assertEqual(str(image.xmpData()['Xmp.dc.format'].value()),
+                         'image/png')
+        # lazy mode off
+        image.setLazyXmp(False)
+        image.readMetadata()
+        image.xmpData()['Xmp.dc.format'] = 'image/png'
+        image.writeMetadata()
+        image.readMetadata()
+        self.assertEqual(str(image.xmpData()['Xmp.dc.format'].value()),
+                         'image/png')
+
+    def test_write_in_place(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'image.jpg')
+            shutil.copyfile(self.image_path, path)
+            image = exiv2.ImageFactory.open(path)
+            image.readMetadata()
+            # normal write, in case libexiv2 changes the file layout
+            self.assertEqual(image.writeMetadata(False), False)
+            size = os.path.getsize(path)
+            # same size change is written in place
+            key = 'Exif.Image.ProcessingSoftware'
+            software = image.exifData()[key].toString()
+            image.exifData()[key] = software[::-1]
+            self.assertEqual(image.writeMetadata(True), True)
+            self.assertEqual(os.path.getsize(path), size)
+            image = exiv2.ImageFactory.open(path)
+            image.readMetadata()
+            self.assertEqual(image.exifData()[key].toString(), software[::-1])
+            # size change needs a normal write
+            image.exifData()[key] = software + ' extra'
+            self.assertEqual(image.writeMetadata(True), False)
+            self.assertNotEqual(os.path.getsize(path), size)
+            image = exiv2.ImageFactory.open(path)
+            image.readMetadata()
+            self.assertEqual(image.exifData()[key].toString(),
+                             software + ' extra')
+            # lazy XMP mode reuses the XMP packet
+            image = exiv2.ImageFactory.open(path)
+            image.setLazyXmp(True)
+            image.readMetadata()
+            packet = image.xmpPacket()
+            image.exifData()[key] = software + ' EXTRA'
+            self.assertEqual(image.writeMetadata(True), True)
+            self.assertEqual(image.writeXmpFromPacket(), False)
+            image = exiv2.ImageFactory.open(path)
+            image.readMetadata()
+            self.assertEqual(image.xmpPacket(), packet)
+            self.assertEqual(image.exifData()[key].toString(),
+                             software + ' EXTRA')
+            # setXmpData and setMetadata stop the packet being reused
+            image.setLazyXmp(True)
+            image.readMetadata()
+            xmp_data = exiv2.XmpData()
+            xmp_data['Xmp.dc.format'] = 'image/png'
+            image.setXmpData(xmp_data)
+            image.writeMetadata(True)
+            image.readMetadata()
+            self.assertNotEqual(image.xmpPacket(), packet)
+            self.assertEqual(str(image.xmpData()['Xmp.dc.format'].value()),
+                             'image/png')
+            other = exiv2.ImageFactory.open(self.image_data)
+            other.readMetadata()
+            image.readMetadata()
+            image.setMetadata(other)
+            image.writeMetadata(True)
+            image.readMetadata()
+            self.assertNotIn('Xmp.dc.format', image.xmpData())
+        # image in memory can't be written in place
+        image = exiv2.ImageFactory.open(self.image_data)
+        image.readMetadata()
+        self.assertEqual(image.writeMetadata(True), False)
+
+    def test_structure(self):
+        image = exiv2.ImageFactory.open(self.image_data)
+        structure = image.structure()
+        self.assertIsInstance(structure, list)
+        self.assertEqual(structure[0], {
+            'address': 0, 'marker': 0xffd8, 'name': 'SOI', 'length': None})
+        self.assertEqual(structure[-1], {
+            'address': len(self.image_data) - 2, 'marker': 0xffd9,
+            'name': 'EOI', 'length': None})
+        self.assertIn('SOS', [x['name'] for x in structure])
+        segments = [x for x in structure if x['name'] == 'APP1']
+        self.assertGreater(len(segments), 0)
+        for segment in segments:
+            address = segment['address']
+            length = segment['length']
+            self.assertEqual(segment['marker'], 0xffe1)
+            self.assertEqual(self.image_data[address:address+2], b'\xff\xe1')
+            self.assertEqual(
+                int.from_bytes(self.image_data[address+2:address+4], 'big'),
+                length)
+        # invalid data
+        image = exiv2.ImageFactory.open(
+            self.image_data[:segments[0]['address'] + 10])
+        with self.assertRaises(exiv2.Exiv2Error):
+            image.structure()
+        # other formats are not supported
+        with open(os.path.join(os.path.dirname(__file__), 'image_02.heic'),
+                  'rb') as f:
+            image = exiv2.ImageFactory.open(f.read())
+        with self.assertRaises(exiv2.Exiv2Error):
+            image.structure()
+        for image_type in (exiv2.ImageType.png, exiv2.ImageType.tiff):
+            image = exiv2.ImageFactory.create(image_type)
+            with self.assertRaises(exiv2.Exiv2Error):
+                image.structure()
+
+    def test_content_digest(self):
+        image = exiv2.ImageFactory.open(self.image_data)
+        digest = image.content_digest()
+        self.assertIsInstance(digest, bytes)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(len(image.content_digest('sha256')), 32)
+        with self.assertRaises(ValueError):
+            image.content_digest('not a hash')
+        # digest doesn't depend on metadata
+        image.readMetadata()
+        image.exifData()['Exif.Image.Orientation'] = 3
+        image.clearXmpData()
+        image.setComment('fred')
+        image.writeMetadata()
+        self.assertNotEqual(len(image.io()), len(self.image_data))
+        self.assertEqual(image.content_digest(), digest)
+        # image_01.jpg has the same image data with different metadata
+        with open(os.path.join(os.path.dirname(__file__), 'image_01.jpg'),
+                  'rb') as f:
+            image = exiv2.ImageFactory.open(f.read())
+        self.assertEqual(image.content_digest(), digest)
+        # different image data
+        data = bytearray(self.image_data)
+        data[-5] ^= 0xff
+        image = exiv2.ImageFactory.open(bytes(data))
+        self.assertNotEqual(image.content_digest(), digest)
+        # PNG image
+        image = exiv2.ImageFactory.create(exiv2.ImageType.png)
+        digest = image.content_digest()
+        image.readMetadata()
+        image.setComment('fred')
+        image.exifData()['Exif.Image.Make'] = 'Acme'
+        image.xmpData()['Xmp.dc.format'] = 'image/png'
+        image.writeMetadata()
+        self.assertEqual(image.content_digest(), digest)
+        # other formats are not supported
+        with open(os.path.join(os.path.dirname(__file__), 'image_02.heic'),
+                  'rb') as f:
+            image = exiv2.ImageFactory.open(f.read())
+        with self.assertRaises(exiv2.Exiv2Error):
+            image.content_digest()
+
     def test_ImageFactory(self):
         factory = exiv2.ImageFactory
         with self.assertWarns(DeprecationWarning):
@@ -187,6 +377,77 @@ class TestImageModule(unittest.TestCase):
                           exiv2.ImageType, exiv2.ImageType.jpeg)
         self.assertIsInstance(factory.open(self.image_path), exiv2.Image)
 
+    def test_open_file_object(self):
+        class Reader(io.BytesIO):
+            # count bytes actually read
+            bytes_read = 0
+            def readinto(self, buf):
+                result = super().readinto(buf)
+                self.bytes_read += result
+                return result
+
+        fileobj = Reader(self.image_data)
+        image = exiv2.ImageFactory.open(fileobj)
+        self.assertIsInstance(image, exiv2.Image)
+        self.assertEqual(len(image.io()), len(self.image_data))
+        image.readMetadata()
+        self.assertEqual(len(image.exifData()), 29)
+        self.assertEqual(len(image.iptcData()), 19)
+        self.assertEqual(len(image.xmpData()), 26)
+        # the image data after the metadata isn't read
+        self.assertLess(fileobj.bytes_read, len(self.image_data))
+        # image keeps a reference to file object
+        count = sys.getrefcount(fileobj)
+        del image
+        self.assertEqual(sys.getrefcount(fileobj), count - 1)
+        # real file
+        with open(self.image_path, 'rb') as f:
+            image = exiv2.ImageFactory.open(f)
+            image.readMetadata()
+            self.assertEqual(len(image.exifData()), 29)
+            self.check_result(image.data(), memoryview, self.image_data)
+            # images opened from file objects are read only
+            with self.assertRaises(exiv2.Exiv2Error):
+                image.writeMetadata()
+        # name that can't be encoded as UTF-8
+        fileobj = Reader(self.image_data)
+        fileobj.name = 'image\udc80.jpg'
+        image = exiv2.ImageFactory.open(fileobj)
+        self.assertEqual(image.io().path(), '<file object>')
+        # not an image
+        with self.assertRaises(exiv2.Exiv2Error):
+            exiv2.ImageFactory.open(io.BytesIO(b'not an image'))
+
+    def test_open_many(self):
+        if not exiv2.versionInfo()['EXV_ENABLE_FILESYSTEM']:
+            self.skipTest('EXV_ENABLE_FILESYSTEM is off')
+        missing = os.path.join(os.path.dirname(self.image_path), 'missing.jpg')
+        paths = [self.image_path, missing, self.image_path]
+        batch = exiv2.ImageFactory.open_many(paths, 2)
+        self.assertIsInstance(batch, exiv2.ImageBatch)
+        self.assertIs(iter(batch), batch)
+        results = list(batch)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(sorted(x[0] for x in results), sorted(paths))
+        for path, result in results:
+            if path == missing:
+                self.assertIsInstance(result, exiv2.Exiv2Error)
+                continue
+            self.assertIsInstance(result, exiv2.Image)
+            self.assertEqual(len(result.exifData()), 29)
+            self.assertEqual(len(result.iptcData()), 19)
+            self.assertEqual(len(result.xmpData()), 26)
+        self.assertEqual(list(exiv2.ImageFactory.open_many([])), [])
+        # bytes and path-like paths
+        paths = [os.fsencode(self.image_path), pathlib.Path(self.image_path)]
+        for path, result in exiv2.ImageFactory.open_many(paths):
+            self.assertIn(path, paths)
+            self.assertIsInstance(result, exiv2.Image)
+        # abandon a batch part way through
+        batch = exiv2.ImageFactory.open_many(paths * 10, 1)
+        next(batch)
+        del batch
+
     def test_ref_counts(self):
         # opening from data keeps reference to buffer
         count = sys.getrefcount(self.image_data)
@@ -177,6 +177,51 @@ class TestIptcModule(unittest.TestCase):
         with self.assertRaises(TypeError):
             datum.setValue(123)
 
+    def test_key_lookup(self):
+        self.image.readMetadata()
+        data = self.image.iptcData()
+        keywords = [datum.toString() for datum in data
+                    if datum.key() == 'Iptc.Application2.Keywords']
+        self.assertGreater(len(keywords), 1)
+        keys = [datum.key() for datum in data]
+        for key in keys:
+            self.assertEqual(data[key].key(), key)
+        # repeated keys find the first datum
+        self.assertEqual(
+            data['Iptc.Application2.Keywords'].toString(), keywords[0])
+        del data['Iptc.Application2.Keywords']
+        self.assertEqual(
+            data['Iptc.Application2.Keywords'].toString(), keywords[1])
+        # erasing moves the later data
+        del data[keys[0]]
+        self.assertEqual(keys[0] in data, False)
+        for key in keys[1:]:
+            self.assertEqual(data[key].key(), key)
+        data.erase(data.begin())
+        for key in keys[2:]:
+            self.assertEqual(data[key].key(), key)
+
+    def test_records(self):
+        self.image.readMetadata()
+        data = self.image.iptcData()
+        records = data.records()
+        self.assertIsInstance(records, list)
+        self.assertEqual(len(records), len(data))
+        for record, datum in zip(records, data):
+            self.assertIsInstance(record, exiv2.Iptcdatum_record)
+            self.assertEqual(record.key, datum.key())
+            self.assertEqual(record.typeId, datum.typeId())
+            self.assertIsInstance(record.typeId, exiv2.TypeId)
+            self.assertEqual(record.count, datum.count())
+            self.assertIsInstance(record.data, bytes)
+            self.assertEqual(len(record.data), datum.size())
+            if datum.typeId() == exiv2.TypeId.string:
+                self.assertEqual(record.data.decode(), datum.toString())
+        # records don't refer to the container
+        data.clear()
+        self.assertEqual(records[0].key, 'Iptc.Envelope.CharacterSet')
+        self.assertEqual(data.records(), [])
+
     def test_IptcData_iterator(self):
         self.image.readMetadata()
         data = self.image.iptcData()
@@ -204,6 +249,22 @@ class TestIptcModule(unittest.TestCase):
         del datum2
         self._test_datum(datum)
 
+    def test_to_dict(self):
+        self.image.readMetadata()
+        data = self.image.iptcData()
+        result = data.to_dict()
+        self.assertIsInstance(result, dict)
+        keywords = [datum.toString() for datum in data
+                    if datum.key() == 'Iptc.Application2.Keywords']
+        self.assertGreater(len(keywords), 1)
+        self.assertEqual(result['Iptc.Application2.Keywords'], keywords)
+        self.assertEqual(len(result), len(set(datum.key() for datum in data)))
+        result = data.to_dict('string')
+        self.assertEqual(result['Iptc.Application2.Keywords'], keywords)
+        for datum in data:
+            if datum.key() != 'Iptc.Application2.Keywords':
+                self.assertEqual(result[datum.key()], datum.toString())
+
     def test_ref_counts(self):
         self.image.readMetadata()
         # iptcData keeps a reference to image
@@ -107,6 +107,15 @@ class TestTypesModule(unittest.TestCase):
             value[0] = 23
             self.check_result(value[0], int, 23)
 
+    def test_TypeId(self):
+        self.assertIn('value type identifiers', exiv2.TypeId.__doc__)
+        self.assertIn('ASCII', exiv2.TypeId.asciiString.__doc__)
+        # members with no doc string have the enum's doc string
+        self.assertEqual(exiv2.ByteOrder.bigEndian.__doc__,
+                         exiv2.ByteOrder.__doc__)
+        with self.assertRaises(AttributeError):
+            exiv2.TypeId.asciiString.__doc__ = 'ASCII'
+
     def test_TypeInfo(self):
         info = exiv2.TypeInfo
         self.check_result(info.typeId('Rational'),
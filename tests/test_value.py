@@ -16,6 +16,7 @@
 ##  along with this program.  If not, see
 ##  <http://www.gnu.org/licenses/>.
 
+import array
 import datetime
 from fractions import Fraction
 import io
@@ -141,6 +142,7 @@ class TestValueModule(unittest.TestCase):
     def do_common_xmp_tests(self, value):
         with self.assertWarns(DeprecationWarning):
             type_ = exiv2.XmpArrayType.xaSeq
+        self.assertIs(type_, exiv2.XmpValue.XmpArrayType.xaSeq)
         for type_ in (exiv2.XmpValue.XmpArrayType.xaSeq,
                       exiv2.XmpValue.XmpArrayType.xaBag,
                       exiv2.XmpValue.XmpArrayType.xaAlt,
@@ -341,6 +343,15 @@ class TestValueModule(unittest.TestCase):
         self.check_result(
             value.typeId(), exiv2.TypeId, exiv2.TypeId.unsignedByte)
         self.assertEqual(len(value), 0)
+        # the same enum member is returned every time
+        for i in range(3):
+            self.assertIs(value.typeId(), exiv2.TypeId.unsignedByte)
+        # a value that's not in the enum is returned as an int
+        with self.assertWarns(DeprecationWarning):
+            value = exiv2.Value.create(99)
+        self.assertIsInstance(value, exiv2.DataValue)
+        self.assertIs(type(value.typeId()), int)
+        self.assertEqual(value.typeId(), 99)
         value = exiv2.DataValue(data)
         self.assertIsInstance(value, exiv2.DataValue)
         self.check_result(value.typeId(), exiv2.TypeId, exiv2.TypeId.undefined)
@@ -533,6 +544,39 @@ class TestValueModule(unittest.TestCase):
         self.assertEqual(len(value), len(sequence) - 1)
         value.append(3)
         self.assertEqual(value[3], 3)
+        # memoryview access
+        value = exiv2.UShortValue(sequence)
+        view = value.data()
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(view.format, 'H')
+        self.assertEqual(view.tolist(), list(sequence))
+        view[1] = 23
+        self.assertEqual(value[1], 23)
+        value.append(3)
+        with self.assertRaises(ValueError):
+            view[0]
+        self.assertEqual(len(exiv2.UShortValue().data()), 0)
+        # buffer access
+        value = exiv2.UShortValue(array.array('H', sequence))
+        self.assertEqual(tuple(value), sequence)
+        value = exiv2.UShortValue(memoryview(array.array('H', sequence)))
+        self.assertEqual(tuple(value), sequence)
+        # components can be any integer type, e.g. NumPy scalars
+        class Index(object):
+            def __init__(self, value):
+                self.value = value
+
+            def __index__(self):
+                return self.value
+
+        value = exiv2.UShortValue([Index(x) for x in sequence])
+        self.assertEqual(tuple(value), sequence)
+        value.set_from_buffer(array.array('H', (1, 2)))
+        self.assertEqual(tuple(value), (1, 2))
+        with self.assertRaises(TypeError):
+            value.set_from_buffer(array.array('d', (1, 2)))
+        with self.assertRaises(TypeError):
+            value.set_from_buffer(b'1234')
         # other methods
         value = exiv2.UShortValue(sequence)
         self.do_common_tests(
@@ -568,6 +612,23 @@ class TestValueModule(unittest.TestCase):
         self.assertEqual(len(value), len(sequence) - 1)
         value.append((3, 1))
         self.assertEqual(value[2], (3, 1))
+        # memoryview access
+        value = exiv2.URationalValue(sequence)
+        view = value.data()
+        self.assertEqual(view.format, 'I')
+        self.assertEqual(view.shape, (len(sequence), 2))
+        self.assertEqual(view.tolist(), [list(x) for x in sequence])
+        view[1, 1] = 11
+        self.assertEqual(value[1], (7, 11))
+        del value[0]
+        with self.assertRaises(ValueError):
+            view[0, 0]
+        # buffer access
+        value = exiv2.URationalValue(
+            array.array('I', [x for y in sequence for x in y]))
+        self.assertEqual(tuple(value), sequence)
+        with self.assertRaises(TypeError):
+            value.set_from_buffer(array.array('I', (1, 2, 3)))
         # other methods
         value = exiv2.URationalValue(sequence)
         self.do_common_tests(
@@ -16,6 +16,10 @@
 ##  along with this program.  If not, see
 ##  <http://www.gnu.org/licenses/>.
 
+import importlib
+import os
+import subprocess
+import sys
 import unittest
 
 import exiv2
@@ -44,6 +48,53 @@ class TestVersionModule(unittest.TestCase):
         self.assertGreaterEqual(
             version, '.'.join(str(x) for x in version_tuple))
 
+    def test_lazy_import(self):
+        # use a new interpreter, as other tests have imported everything
+        script = """
+import sys
+import exiv2
+assert not hasattr(exiv2, '__path_hook__')
+assert 'exiv2._preview' not in sys.modules
+assert isinstance(exiv2.PreviewManager, type)
+assert 'exiv2._preview' in sys.modules
+assert 'PreviewManager' in exiv2.__all__
+assert 'XmpData' in dir(exiv2)
+namespace = {}
+exec('from exiv2 import *', namespace)
+assert 'ImageFactory' in namespace
+try:
+    exiv2.NoSuchName
+    assert False
+except AttributeError:
+    pass
+"""
+        subprocess.run([sys.executable, '-c', script], check=True)
+
+    def test_bench_startup(self):
+        path = os.path.join(os.path.dirname(__file__), 'image_02.jpg')
+        result = subprocess.run(
+            [sys.executable, '-m', 'exiv2', '--bench-startup', path,
+             '--repeats', '1'],
+            check=True, capture_output=True, text=True)
+        self.assertIn('cold start times', result.stdout)
+        self.assertIn('import exiv2', result.stdout)
+
+    def test_names_table(self):
+        # exiv2/__init__.py is generated by utils/build_swig.py, a name
+        # missing from its table makes the first use import every module
+        for module in exiv2._modules:
+            importlib.import_module('exiv2.' + module)
+            names = set(x for x in sys.modules['exiv2._' + module].__all__
+                        if x[0] != '_')
+            missing = sorted(names - set(exiv2._names[module]))
+            self.assertEqual(missing, [], f'exiv2._names[{module!r}]')
+        # deprecated enum aliases are found by the module's __getattr__
+        for module, name in (('basicio', 'Position'),
+                             ('value', 'CharsetId'),
+                             ('value', 'XmpArrayType'),
+                             ('value', 'XmpStruct')):
+            self.assertIn(name, exiv2._names[module])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -18,7 +18,9 @@
 
 import io
 import os
+import pathlib
 import sys
+import tempfile
 import unittest
 
 import exiv2
@@ -210,6 +212,121 @@ class TestXmpModule(unittest.TestCase):
         del datum2
         self._test_datum(datum)
 
+    def test_to_dict(self):
+        self.image.readMetadata()
+        data = self.image.xmpData()
+        result = data.to_dict()
+        self.assertIsInstance(result, dict)
+        self.assertEqual(list(result), [datum.key() for datum in data])
+        for datum in data:
+            value = result[datum.key()]
+            type_id = datum.typeId()
+            if type_id in (exiv2.TypeId.xmpBag, exiv2.TypeId.xmpSeq):
+                self.assertIsInstance(value, list)
+                self.assertEqual(len(value), datum.count())
+            elif type_id == exiv2.TypeId.langAlt:
+                self.assertIsInstance(value, dict)
+            elif type_id == exiv2.TypeId.xmpText:
+                self.assertEqual(value, datum.toString())
+        self.assertIsInstance(result['Xmp.dc.creator'], list)
+        result = data.to_dict('string')
+        for datum in data:
+            self.assertEqual(result[datum.key()], datum.toString())
+
+    def test_records(self):
+        self.image.readMetadata()
+        data = self.image.xmpData()
+        records = data.records()
+        self.assertIsInstance(records, list)
+        self.assertEqual(len(records), len(data))
+        for record, datum in zip(records, data):
+            self.assertIsInstance(record, exiv2.Xmpdatum_record)
+            self.assertEqual(record.key, datum.key())
+            self.assertEqual(record.typeId, datum.typeId())
+            self.assertIsInstance(record.typeId, exiv2.TypeId)
+            self.assertEqual(record.count, datum.count())
+            self.assertIsInstance(record.data, bytes)
+            self.assertEqual(len(record.data), datum.size())
+            if datum.typeId() == exiv2.TypeId.xmpText:
+                self.assertEqual(record.data.decode(), datum.toString())
+        # records don't refer to the container
+        key = records[0].key
+        data.clear()
+        self.assertEqual(records[0].key, key)
+        self.assertEqual(data.records(), [])
+
+    def test_packet(self):
+        self.image.readMetadata()
+        data = self.image.xmpData()
+        packet = self.image.xmpPacket()
+        copy = exiv2.XmpData.from_packet(packet)
+        self.assertIsInstance(copy, exiv2.XmpData)
+        self.assertEqual([datum.key() for datum in copy],
+                         [datum.key() for datum in data])
+        copy = exiv2.XmpData.from_packet(packet.encode('utf-8'))
+        self.assertEqual(len(copy), len(data))
+        result = copy.to_packet()
+        self.assertIsInstance(result, str)
+        self.assertTrue(result.startswith('<?xpacket'))
+        self.assertEqual(len(exiv2.XmpData.from_packet(result)), len(data))
+        result = copy.to_packet(exiv2.XmpParser.omitPacketWrapper |
+                                exiv2.XmpParser.useCompactFormat)
+        self.assertFalse(result.startswith('<?xpacket'))
+        self.assertEqual(len(exiv2.XmpData.from_packet(result)), len(data))
+        self.assertGreater(
+            len(copy.to_packet(exiv2.XmpParser.useCompactFormat, 4096)),
+            len(copy.to_packet()) + 4000)
+        self.assertEqual(exiv2.XmpData().to_packet(), '')
+        with self.assertRaises(exiv2.Exiv2Error):
+            exiv2.XmpData.from_packet('<not xmp')
+
+    def test_sidecar(self):
+        if not exiv2.versionInfo()['EXV_ENABLE_FILESYSTEM']:
+            self.skipTest('EXV_ENABLE_FILESYSTEM is off')
+        self.image.readMetadata()
+        data = self.image.xmpData()
+        keys = [datum.key() for datum in data]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'test.xmp')
+            exiv2.write_sidecar(path, data)
+            with open(path, 'rb') as f:
+                self.assertTrue(f.read().startswith(b'<?xpacket begin='))
+            # check it matches a sidecar written by libexiv2
+            sidecar = exiv2.XmpData()
+            sidecar['Xmp.xmp.CreatorTool'] = 'Acme'
+            sidecar['Xmp.dc.title'] = 'lang="x-default" Hello'
+            ref_path = os.path.join(tmp_dir, 'ref.xmp')
+            image = exiv2.ImageFactory.create(exiv2.ImageType.xmp, ref_path)
+            image.setXmpData(sidecar)
+            image.writeMetadata()
+            del image
+            test_path = os.path.join(tmp_dir, 'test2.xmp')
+            exiv2.write_sidecar(test_path, sidecar)
+            with open(ref_path, 'rb') as ref, open(test_path, 'rb') as test:
+                self.assertEqual(test.read(), ref.read())
+            # existing file is replaced
+            exiv2.write_sidecar(test_path, data)
+            self.assertEqual(len(exiv2.read_sidecar(test_path)), len(data))
+            self.assertNotIn('test2.xmp.exiv2-tmp', os.listdir(tmp_dir))
+            # check libexiv2 can read it
+            image = exiv2.ImageFactory.open(path)
+            self.assertEqual(image.imageType(), exiv2.ImageType.xmp)
+            image.readMetadata()
+            self.assertEqual(len(image.xmpData()), len(data))
+            copy = exiv2.read_sidecar(path)
+            self.assertIsInstance(copy, exiv2.XmpData)
+            self.assertEqual([datum.key() for datum in copy], keys)
+            missing = os.path.join(tmp_dir, 'missing.xmp')
+            with self.assertRaises(exiv2.Exiv2Error):
+                exiv2.read_sidecar(missing)
+            result = exiv2.read_sidecars([path, missing, pathlib.Path(path)])
+            self.assertEqual(len(result), 3)
+            self.assertIsInstance(result[0], exiv2.XmpData)
+            self.assertEqual([datum.key() for datum in result[0]], keys)
+            self.assertIsInstance(result[1], exiv2.Exiv2Error)
+            self.assertIsInstance(result[2], exiv2.XmpData)
+            self.assertEqual(exiv2.read_sidecars([]), [])
+
     def test_pointers(self):
         data = exiv2.XmpData()
         data.add(exiv2.Xmpdatum(
@@ -15,7 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import ast
 import os
+import pprint
 import re
 import shutil
 import subprocess
@@ -35,6 +37,127 @@ def get_version(incl_dir):
     return 0, 0, 0, 0
 
 
+def get_public_names(output_dir, ext_name):
+    """Get the public names defined by a SWIG generated module."""
+    names = []
+    # names added to the extension module's namespace
+    in_methods = False
+    module_dict = True
+    with open(os.path.join(output_dir, ext_name + '_wrap.cxx')) as cxx:
+        for line in cxx.readlines():
+            line = line.strip()
+            if line.startswith('static PyMethodDef SwigMethods[]'):
+                in_methods = True
+            elif in_methods:
+                if line.startswith('};'):
+                    in_methods = False
+                match = re.match(r'{ "(\w+)"', line)
+                if match:
+                    names.append(match.group(1))
+            elif line == 'd = md;':
+                module_dict = True
+            elif line == 'd = PyDict_New();':
+                module_dict = False
+            else:
+                match = re.match(r'(PyModule_AddObject\(m, |'
+                                 r'SwigPyBuiltin_AddPublicSymbol\('
+                                 r'public_interface, )"(\w+)"', line)
+                if not match and module_dict:
+                    match = re.match(r'(SWIG_Python_SetConstant\(d, d == md '
+                                     r'\? public_interface : NULL, )"(\w+)"',
+                                     line)
+                if match:
+                    names.append(match.group(2))
+    # names added by %pythoncode
+    with open(os.path.join(output_dir, ext_name + '.py')) as py:
+        tree = ast.parse(py.read())
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            names.append(node.name)
+        elif isinstance(node, ast.Assign):
+            names += [x.id for x in node.targets if isinstance(x, ast.Name)]
+        elif (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)
+              and getattr(node.value.func, 'id', '') == '_deprecated_enum'):
+            # deprecated alias found by the module's __getattr__
+            names.append(node.value.args[-1].value)
+    return sorted(set(x for x in names if x[0] != '_'))
+
+
+def write_init(output_dir, ext_names, py_exiv2_version):
+    """Write the package __init__.py module.
+
+    Extension modules are only imported when one of their names is first
+    used, to reduce the time taken by "import exiv2".
+    """
+    names = dict((x, tuple(get_public_names(output_dir, x)))
+                 for x in ext_names)
+    init_file = os.path.join(output_dir, '__init__.py')
+    with open(init_file, 'w') as im:
+        im.write(f'''
+import importlib
+import os
+import sys
+
+if sys.platform == 'win32':
+    _dir = os.path.join(os.path.dirname(__file__), 'lib')
+    if os.path.isdir(_dir):
+        if hasattr(os, 'add_dll_directory'):
+            os.add_dll_directory(_dir)
+        os.environ['PATH'] = _dir + ';' + os.environ['PATH']
+
+#: python-exiv2 version as a string
+__version__ = "{py_exiv2_version}"
+#: python-exiv2 version as a tuple of ints
+__version_tuple__ = tuple(({', '.join(re.split(r'[-.]', py_exiv2_version))}))
+
+from exiv2.extras import Exiv2Error
+# The error module sends libexiv2 log messages to Python's logging
+import exiv2.error
+
+# Extension modules are imported when one of their names is first used
+_modules = {pprint.pformat(tuple(ext_names), width=78)}
+_names = {pprint.pformat(names, width=78)}
+_module_of = dict((name, module) for module in _modules
+                  for name in _names[module])
+
+
+def __getattr__(name):
+    global __all__
+    if name == '__all__':
+        __all__ = ['Exiv2Error']
+        for module in _modules:
+            importlib.import_module('exiv2.' + module)
+            __all__ += sys.modules['exiv2._' + module].__all__
+        __all__ = [x for x in __all__ if x[0] != '_']
+        __all__.sort()
+        return __all__
+    if name in _modules:
+        return importlib.import_module('exiv2.' + name)
+    if name.startswith('_'):
+        # Don't import every module looking for private or dunder names
+        raise AttributeError(f"module 'exiv2' has no attribute '{{name}}'")
+    # Search every module for names not in the table
+    for module in (_module_of[name],) if name in _module_of else _modules:
+        module = importlib.import_module('exiv2.' + module)
+        if name in module.__dict__:
+            if name in getattr(module, '__all__', (name,)):
+                result = module.__dict__[name]
+                globals()[name] = result
+                return result
+        elif '__getattr__' in module.__dict__:
+            # Deprecated names are not cached, so they always warn
+            try:
+                return module.__getattr__(name)
+            except AttributeError:
+                pass
+    raise AttributeError(f"module 'exiv2' has no attribute '{{name}}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules) | set(_module_of))
+''')
+
+
 def main():
     # get SWIG version
     cmd = ['swig', '-version']
@@ -129,42 +252,16 @@ def main():
             # Functions with just one parameter and a default value don't
             # work with fastunpack.
             # See https://github.com/swig/swig/issues/2786
+            # NOFASTUNPACK tells the slot functions in shared/slots.i
             if swig_version < (4, 4, 0) and ext_name in (
                     'basicio', 'exif', 'iptc', 'metadatum', 'value', 'xmp'):
-                cmd.append('-nofastunpack')
+                cmd += ['-nofastunpack', '-DNOFASTUNPACK']
             cmd += ['-o', os.path.join(output_dir, ext_name + '_wrap.cxx')]
             cmd += [os.path.join(interface_dir, ext_name + '.i')]
             print(' '.join(cmd))
             subprocess.check_call(cmd)
     # create init module
-    init_file = os.path.join(output_dir, '__init__.py')
-    with open(init_file, 'w') as im:
-        im.write(f'''
-import os
-import sys
-
-if sys.platform == 'win32':
-    _dir = os.path.join(os.path.dirname(__file__), 'lib')
-    if os.path.isdir(_dir):
-        if hasattr(os, 'add_dll_directory'):
-            os.add_dll_directory(_dir)
-        os.environ['PATH'] = _dir + ';' + os.environ['PATH']
-
-#: python-exiv2 version as a string
-__version__ = "{py_exiv2_version}"
-#: python-exiv2 version as a tuple of ints
-__version_tuple__ = tuple(({', '.join(re.split(r'[-.]', py_exiv2_version))}))
-
-from exiv2.extras import Exiv2Error
-__all__ = ["Exiv2Error"]
-''')
-        for name in ext_names:
-            im.write(f'from exiv2.{name} import *\n')
-            im.write(f'__all__ += exiv2._{name}.__all__\n')
-        im.write("""
-__all__ = [x for x in __all__ if x[0] != '_']
-__all__.sort()
-""")
+    write_init(output_dir, ext_names, py_exiv2_version)
     # update Sphinx config
     with open('src/doc/requirements.txt', 'w') as f:
         f.write(f'''exiv2 == {py_exiv2_version}